@@ -0,0 +1,158 @@
+"""
+Materialized KPI aggregate tables (daily rollup, emergency load, doctor
+utilization, hourly admissions), rebuilt with one GROUP BY each after every
+load and kept current between loads by ingest.py.
+"""
+import time
+
+import pandas as pd
+from sqlalchemy import Column, Index, MetaData, Table
+from trends import bucket_start
+
+WEEKDAYS = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+
+
+def _date(dialect, col):
+    if dialect == "mssql":
+        return f"CAST({col} AS DATE)"
+    if dialect == "sqlite":
+        return f"DATE({col})"
+    raise ValueError(f"Unsupported SQL dialect for KPI aggregates: {dialect}")
+
+
+def _weekday_name(dialect, col):
+    if dialect == "mssql":
+        return f"DATENAME(WEEKDAY, {col})"
+    if dialect == "sqlite":
+        cases = " ".join(f"WHEN '{i}' THEN '{day}'" for i, day in enumerate(WEEKDAYS))
+        return f"CASE strftime('%w', {col}) {cases} END"
+    raise ValueError(f"Unsupported SQL dialect for KPI aggregates: {dialect}")
+
+
+def _hour(dialect, col):
+    if dialect == "mssql":
+        return f"DATEPART(HOUR, {col})"
+    if dialect == "sqlite":
+        return f"CAST(strftime('%H', {col}) AS INTEGER)"
+    raise ValueError(f"Unsupported SQL dialect for KPI aggregates: {dialect}")
+
+
+def admission_rollup_query(dialect):
+    admission_date = _date(dialect, "admission_datetime")
+    return f"""
+    SELECT
+        branch_id,
+        department_id,
+        {admission_date} AS admission_date,
+        COUNT(*) AS admissions,
+        SUM(CASE WHEN admission_type = 'Emergency' THEN 1 ELSE 0 END) AS emergency_admissions,
+        SUM(CASE WHEN is_readmission = 1 THEN 1 ELSE 0 END) AS readmissions,
+        SUM(length_of_stay) AS los_sum,
+        COUNT(discharge_datetime) AS discharges
+    FROM admissions
+    GROUP BY branch_id, department_id, {admission_date}
+    """
+
+
+def emergency_load_query(dialect):
+    weekday = _weekday_name(dialect, "admission_datetime")
+    hour = _hour(dialect, "admission_datetime")
+    return f"""
+    SELECT
+        {weekday} AS day_of_week,
+        {hour} AS hour_of_day,
+        COUNT(*) AS emergency_cases
+    FROM admissions
+    WHERE admission_type = 'Emergency'
+    GROUP BY {weekday}, {hour}
+    """
+
+
+def doctor_utilization_query(dialect):
+    return """
+    SELECT
+        doc.doctor_name,
+        dept.department_name,
+        doc.available_hours,
+        COUNT(pr.procedure_id) AS total_procedures,
+        SUM(pr.duration_minutes) / 60.0 AS actual_hours_spent,
+        (SUM(pr.duration_minutes) / 60.0 / NULLIF(doc.available_hours, 0)) * 100 AS utilization_pct
+    FROM doctors doc
+    JOIN departments dept ON doc.department_id = dept.department_id
+    LEFT JOIN procedures pr ON doc.doctor_id = pr.doctor_id
+    GROUP BY doc.doctor_name, dept.department_name, doc.available_hours
+    """
+
+
+def admissions_hourly_query(dialect):
+    hour = bucket_start(dialect, "hour", "admission_datetime")
+    return f"""
+    SELECT
+        {hour} AS bucket_start,
+        branch_id,
+        department_id,
+        COUNT(*) AS admissions,
+        SUM(CASE WHEN admission_type = 'Emergency' THEN 1 ELSE 0 END) AS emergency_admissions,
+        SUM(CASE WHEN is_readmission = 1 THEN 1 ELSE 0 END) AS readmissions,
+        SUM(length_of_stay) AS los_sum,
+        COUNT(discharge_datetime) AS discharges
+    FROM admissions
+    GROUP BY {hour}, branch_id, department_id
+    """
+
+
+# aggregate table -> (query builder, source tables)
+AGGREGATES = {
+    "kpi_admission_rollup": (admission_rollup_query, ["admissions"]),
+    "kpi_emergency_load": (emergency_load_query, ["admissions"]),
+    "kpi_doctor_utilization": (doctor_utilization_query, ["doctors", "departments", "procedures"]),
+    "kpi_admissions_hourly": (admissions_hourly_query, ["admissions"]),
+}
+
+# Indexes created on an aggregate table after each rebuild: name -> columns
+AGGREGATE_INDEXES = {
+    "kpi_admissions_hourly": {
+        "ix_kpi_admissions_hourly_bucket_start": ["bucket_start"],
+        "ix_kpi_admissions_hourly_branch_bucket": ["branch_id", "bucket_start"],
+        "ix_kpi_admissions_hourly_department_bucket": ["department_id", "bucket_start"],
+    },
+}
+
+
+def build_aggregate(engine, name):
+    """Recompute one aggregate table and return its report entry."""
+    query_builder, _ = AGGREGATES[name]
+    start = time.perf_counter()
+    df = pd.read_sql(query_builder(engine.dialect.name), engine)
+    # One transaction on one connection: readers see the old table or the
+    # new one, and index checks see the table that was just created
+    with engine.begin() as conn:
+        df.to_sql(name, conn, if_exists="replace", index=False)
+        table = Table(name, MetaData(), *(Column(c) for c in df.columns))
+        for index, columns in AGGREGATE_INDEXES.get(name, {}).items():
+            Index(index, *(table.c[c] for c in columns)).create(conn, checkfirst=True)
+    return {"status": "built", "rows": len(df), "seconds": round(time.perf_counter() - start, 3)}
+
+
+def build_kpi_aggregates(engine, table_report):
+    """
+    Rebuild the aggregates whose source tables changed in run_load's
+    `table_report`; skip those with a failed source.
+    """
+    report = {}
+    for name, (_, sources) in AGGREGATES.items():
+        statuses = [
+            entry.get("status") if isinstance(entry, dict) else entry
+            for entry in (table_report.get(table) for table in sources)
+        ]
+        failed = [t for t, s in zip(sources, statuses) if s in ("error", "skipped")]
+        if failed:
+            report[name] = {"status": "skipped", "detail": f"Source table(s) failed: {', '.join(failed)}"}
+        elif all(s == "unchanged" for s in statuses):
+            report[name] = {"status": "unchanged", "rows": 0, "seconds": 0.0}
+        else:
+            try:
+                report[name] = build_aggregate(engine, name)
+            except Exception as e:
+                report[name] = {"status": "error", "detail": str(e)}
+    return report
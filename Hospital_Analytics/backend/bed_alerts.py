@@ -0,0 +1,89 @@
+"""
+Critical bed occupancy alerts with keyset pagination: a page's next_cursor
+encodes its last row's sort key, so every page costs the same however deep
+into history it is. NDJSON streaming walks the same pages.
+"""
+import base64
+import json
+import time
+from datetime import datetime, timedelta
+
+from metrics import record
+from sqlalchemy import DateTime, Float, Integer, String, and_, column, or_, select, table
+
+ALERT_THRESHOLD = 90
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+STREAM_PAGE_ROWS = 1000
+
+bed_occupancy = table(
+    "bed_occupancy",
+    column("snapshot_id", Integer),
+    column("department_id", Integer),
+    column("department_name", String),
+    column("branch_id", Integer),
+    column("snapshot_datetime", DateTime),
+    column("occupancy_rate", Float),
+)
+
+ALERT_COLUMNS = ["snapshot_id", "department_id", "department_name", "branch_id", "snapshot_datetime", "occupancy_rate"]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(row):
+    key = [row["occupancy_rate"], row["snapshot_datetime"].isoformat(), row["snapshot_id"]]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        rate, snapshot_datetime, snapshot_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rate), datetime.fromisoformat(snapshot_datetime), int(snapshot_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+
+
+def alerts_query(branch_id=None, department_id=None, start_date=None, end_date=None, cursor=None):
+    """SELECT of alert rows matching the filters, after `cursor` if given."""
+    c = bed_occupancy.c
+    query = (
+        select(*(c[name] for name in ALERT_COLUMNS))
+        .where(c.occupancy_rate > ALERT_THRESHOLD)
+        .order_by(c.occupancy_rate.desc(), c.snapshot_datetime, c.snapshot_id)
+    )
+    if branch_id is not None:
+        query = query.where(c.branch_id == branch_id)
+    if department_id is not None:
+        query = query.where(c.department_id == department_id)
+    if start_date is not None:
+        query = query.where(c.snapshot_datetime >= datetime.combine(start_date, datetime.min.time()))
+    if end_date is not None:
+        # end_date is inclusive
+        query = query.where(c.snapshot_datetime < datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+    if cursor is not None:
+        rate, snapshot_datetime, snapshot_id = decode_cursor(cursor)
+        query = query.where(or_(
+            c.occupancy_rate < rate,
+            and_(c.occupancy_rate == rate, c.snapshot_datetime > snapshot_datetime),
+            and_(c.occupancy_rate == rate, c.snapshot_datetime == snapshot_datetime, c.snapshot_id > snapshot_id),
+        ))
+    return query
+
+
+def fetch_alerts_page(engine, limit=DEFAULT_PAGE_SIZE, **filters):
+    """One page of alerts plus the cursor of the next page (None on the last page)."""
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        connected = time.perf_counter()
+        # One extra row tells whether another page follows
+        rows = conn.execute(alerts_query(**filters).limit(limit + 1)).mappings().all()
+    record("pool_wait_seconds", connected - start)
+    record("db_seconds", time.perf_counter() - connected)
+    record("rows", len(rows))
+    items = [dict(row) for row in rows[:limit]]
+    next_cursor = encode_cursor(items[-1]) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
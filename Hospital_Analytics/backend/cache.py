@@ -0,0 +1,105 @@
+"""
+In-process TTL/LRU result cache for KPI endpoints, cleared whenever the
+data changes; results computed across a clear are not stored.
+"""
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire `ttl` seconds after being stored."""
+
+    def __init__(self, maxsize=128, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Bumped by clear(); set() drops values computed under an older generation
+        self.generation = 0
+
+    def get(self, key, default=_MISSING):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, generation=None):
+        """
+        Store `value`, unless `generation` (read before computing it) shows
+        the cache has been cleared since.
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+            self.generation += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+def cached(cache):
+    """
+    Cache a function's return value per (function, arguments) in `cache`.
+    Coroutine functions are wrapped by a coroutine that caches the awaited result.
+    """
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+                value = cache.get(key)
+                if value is _MISSING:
+                    generation = cache.generation
+                    value = await fn(*args, **kwargs)
+                    cache.set(key, value, generation)
+                return value
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+            value = cache.get(key)
+            if value is _MISSING:
+                generation = cache.generation
+                value = fn(*args, **kwargs)
+                cache.set(key, value, generation)
+            return value
+        return wrapper
+    return decorator
@@ -0,0 +1,10 @@
+"""
+Makes the generator's modules in ../data (schema, readmissions) importable
+from the backend: `import data_path` before importing them.
+"""
+import os
+import sys
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data"))
+if DATA_DIR not in sys.path:
+    sys.path.insert(0, DATA_DIR)
@@ -0,0 +1,193 @@
+"""
+Database engine for the backend, configured from HOSPITAL_* environment
+variables; nothing connects (or imports pyodbc or pandas) until the engine
+is first used or pre-warmed at startup.
+"""
+import contextlib
+import os
+import threading
+import time
+import urllib.parse
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import StaticPool
+
+QUERY_BACKENDS = ["sqlserver", "memory"]
+
+# "sqlserver" queries the database below; "memory" loads the data files into
+# an in-process SQLite database when the engine opens and needs no server
+QUERY_BACKEND = os.environ.get("HOSPITAL_QUERY_BACKEND", "sqlserver")
+if QUERY_BACKEND not in QUERY_BACKENDS:
+    raise ValueError(f"Unknown HOSPITAL_QUERY_BACKEND {QUERY_BACKEND!r}, expected one of {QUERY_BACKENDS}")
+
+# ========================================
+# DATABASE CONFIGURATION
+# ========================================
+# 1. PASTE YOUR SERVER NAME HERE (or set HOSPITAL_DB_SERVER)
+SERVER_NAME = os.environ.get("HOSPITAL_DB_SERVER", "LAPTOP-A27GM7FS\\SQLEXPRESS")
+DATABASE_NAME = os.environ.get("HOSPITAL_DB_NAME", "HospitalAnalytics")
+
+# ODBC Driver 17 is usually standard with SSMS 2022.
+# If it fails, try "ODBC Driver 18 for SQL Server"
+DRIVER = os.environ.get("HOSPITAL_DB_DRIVER", "ODBC Driver 17 for SQL Server")
+
+# Any SQLAlchemy URL (e.g. sqlite:///hospital.db for tests) replaces the SQL
+# Server settings above
+DATABASE_URL = os.environ.get("HOSPITAL_DATABASE_URL")
+
+# Stale connections are detected before use and recycled every 30 minutes
+DB_MAX_OVERFLOW = int(os.environ.get("HOSPITAL_DB_MAX_OVERFLOW", 4))
+DB_POOL_TIMEOUT_SECONDS = int(os.environ.get("HOSPITAL_DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE_SECONDS = int(os.environ.get("HOSPITAL_DB_POOL_RECYCLE", 1800))
+# Connections opened at startup (default: the whole pool, sized in main.py)
+DB_PREWARM_CONNECTIONS = os.environ.get("HOSPITAL_DB_PREWARM")
+
+# SQLite (the memory backend or a sqlite:// URL) takes one writer at a time
+SINGLE_WRITER = QUERY_BACKEND == "memory" or (DATABASE_URL or "").startswith("sqlite")
+
+
+def sqlserver_url():
+    connection_string = (
+        f"DRIVER={{{DRIVER}}};"
+        f"SERVER={SERVER_NAME};"
+        f"DATABASE={DATABASE_NAME};"
+        "Trusted_Connection=yes;"
+        "Encrypt=no;"  # Required for some local SQL 2022 setups
+    )
+    return f"mssql+pyodbc:///?odbc_connect={urllib.parse.quote_plus(connection_string)}"
+
+
+class SerializedStaticPool(StaticPool):
+    """
+    StaticPool whose one shared connection is lent to one checkout at a time,
+    so a query returning it cannot roll back an ingest transaction open on it.
+    dispose() waits for it too; a thread must not hold two connections at once.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._turn = threading.Lock()
+
+    def _do_get(self):
+        self._turn.acquire()
+        try:
+            return super()._do_get()
+        except BaseException:
+            self._turn.release()
+            raise
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._turn.release()
+
+    def dispose(self):
+        with self._turn:
+            super().dispose()
+
+
+def create_database_engine(pool_size, data_folder=None, file_format="csv"):
+    """
+    New engine for the configured backend. The memory backend loads
+    data_folder into it and fails unless every table loaded.
+    """
+    if QUERY_BACKEND == "memory":
+        from memory_backend import load_memory_engine
+
+        engine, report = load_memory_engine(data_folder, file_format)
+        failed_tables = [
+            t for t, r in report.items()
+            if not isinstance(r, dict) or r["status"] in ("error", "skipped")
+        ]
+        if failed_tables:
+            raise RuntimeError(f"Memory backend could not load {', '.join(failed_tables)} from {data_folder}")
+        return engine
+
+    url = make_url(DATABASE_URL or sqlserver_url())
+    if url.get_backend_name() == "sqlite":
+        if url.database in (None, "", ":memory:"):
+            # One in-memory database, shared by every thread
+            return create_engine(url, poolclass=SerializedStaticPool, connect_args={"check_same_thread": False})
+        connect_args = {"check_same_thread": False}
+    else:
+        connect_args = {}
+    kwargs = {}
+    if url.get_driver_name() == "pyodbc":
+        # fast_executemany sends each INSERT batch to SQL Server in one round-trip
+        kwargs["fast_executemany"] = True
+    return create_engine(
+        url,
+        connect_args=connect_args,
+        pool_size=pool_size,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=True,
+        **kwargs,
+    )
+
+
+def prewarm(engine, connections):
+    """
+    Open `connections` pooled connections at once and return them to the
+    pool, so the first requests do not pay for connecting. Returns the
+    seconds taken.
+    """
+    if isinstance(engine.pool, StaticPool):
+        # Every checkout shares the pool's single connection
+        connections = min(connections, 1)
+    start = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        for _ in range(connections):
+            stack.enter_context(engine.connect())
+    return time.perf_counter() - start
+
+
+class Engines:
+    """
+    Holder of the app's engine: created on first get(), replaced by swap()
+    (a memory backend reload, or a benchmark pointing the app elsewhere)
+    and released by dispose(). Thread-safe.
+    """
+
+    def __init__(self, pool_size, data_folder=None, file_format="csv"):
+        self.pool_size = pool_size
+        self.data_folder = data_folder
+        self.file_format = file_format
+        self._engine = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        engine = self._engine
+        if engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = create_database_engine(self.pool_size, self.data_folder, self.file_format)
+                engine = self._engine
+        return engine
+
+    def current(self):
+        """The engine if one is open, without creating it."""
+        return self._engine
+
+    def swap(self, engine):
+        """Serve from `engine` from now on; returns the previous engine, if any."""
+        with self._lock:
+            previous, self._engine = self._engine, engine
+        return previous
+
+    def prewarm(self, connections=None):
+        """Create the engine if needed and fill its pool (HOSPITAL_DB_PREWARM connections by default)."""
+        if connections is None:
+            connections = self.pool_size if DB_PREWARM_CONNECTIONS is None else int(DB_PREWARM_CONNECTIONS)
+        return prewarm(self.get(), connections)
+
+    def dispose(self):
+        """
+        Close the pooled connections and forget the engine; connections
+        still checked out close when they are returned. The next get()
+        opens a new engine.
+        """
+        engine = self.swap(None)
+        if engine is not None:
+            engine.dispose()
@@ -0,0 +1,471 @@
+"""
+ETL: CSV or Parquet files from the data generator -> SQL tables, loaded
+in replace, bulk (chunked) or incremental (checksum and high-water mark)
+mode.
+"""
+import glob
+import hashlib
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+import pandas as pd
+from aggregates import build_kpi_aggregates
+from sqlalchemy import (
+    BigInteger, Column, DateTime, MetaData, String, Table,
+    column, delete, func, inspect, select, table as sql_table,
+)
+from sqlalchemy.schema import CreateTable
+from tables import TABLE_SCHEMAS
+
+import data_path  # noqa: F401  (data/schema.py is shared with the generator)
+from schema import DATETIME_COLUMNS, apply_schema, read_dtypes  # noqa: E402
+
+# Order matters for foreign keys
+TABLES = [
+    "branches", "departments", "doctors", "patients",
+    "admissions", "procedures", "billing", "outcomes", "bed_occupancy"
+]
+
+# Tables referenced by each table's foreign keys; a table loads only after these
+TABLE_DEPENDENCIES = {
+    "branches": [],
+    "departments": ["branches"],
+    "doctors": ["departments"],
+    "patients": [],
+    "admissions": ["branches", "departments", "doctors", "patients"],
+    "procedures": ["admissions", "doctors"],
+    "billing": ["admissions"],
+    "outcomes": ["admissions"],
+    "bed_occupancy": ["branches", "departments"],
+}
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# High-water mark column per table; the generator writes ids in ascending order
+TABLE_KEYS = {
+    "branches": "branch_id",
+    "departments": "department_id",
+    "doctors": "doctor_id",
+    "patients": "patient_id",
+    "admissions": "admission_id",
+    "procedures": "procedure_id",
+    "billing": "admission_id",
+    "outcomes": "admission_id",
+    "bed_occupancy": "snapshot_id",
+}
+
+LOAD_MODES = ["replace", "bulk", "incremental"]
+FILE_FORMATS = ["csv", "parquet"]
+
+# Rows per read_csv chunk / INSERT batch in bulk and incremental mode
+BULK_CHUNK_ROWS = 50_000
+
+CHECKSUM_BLOCK_BYTES = 1024 * 1024
+
+state_metadata = MetaData()
+
+load_state = Table(
+    "etl_load_state", state_metadata,
+    Column("table_name", String(64), primary_key=True),
+    Column("file_checksum", String(64), nullable=False),
+    Column("file_bytes", BigInteger, nullable=False),
+    Column("high_water_mark", BigInteger),
+    Column("loaded_at", DateTime, nullable=False),
+)
+
+
+def read_table_csv(table, source, chunksize=None, names=None):
+    """
+    read_csv with the table's schema dtypes and datetime columns.
+    Pass `names` when `source` is positioned past the header line.
+    """
+    return pd.read_csv(
+        source,
+        dtype=read_dtypes(table),
+        parse_dates=DATETIME_COLUMNS[table] or False,
+        date_format=DATETIME_FORMAT,
+        chunksize=chunksize,
+        names=names,
+        header=None if names else "infer",
+    )
+
+
+def read_table_parquet(file_path, chunksize=None, columns=None):
+    """
+    Read a Parquet table whole, or as an iterator of `chunksize`-row
+    DataFrames. Column types come from the file itself.
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Parquet loading needs pyarrow: pip install pyarrow") from e
+
+    if chunksize is None:
+        return pd.read_parquet(file_path, columns=columns)
+    parquet_file = pq.ParquetFile(file_path)
+    return (
+        batch.to_pandas()
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns)
+    )
+
+
+def read_table_file(table, file_path, chunksize=None):
+    """Dispatch to the CSV or Parquet reader based on the file extension."""
+    if file_path.endswith(".parquet"):
+        # Files written before the shared schema (or by other tools) may hold wider types
+        if chunksize is None:
+            return apply_schema(table, read_table_parquet(file_path))
+        return (apply_schema(table, chunk) for chunk in read_table_parquet(file_path, chunksize))
+    return read_table_csv(table, file_path, chunksize)
+
+
+def table_file(folder, table, file_format="csv"):
+    return os.path.join(folder, f"{table}.{file_format}")
+
+
+def table_files(folder, table, file_format="csv"):
+    """
+    The table's single file if it exists, otherwise its sorted part files
+    from a sharded generator run; empty when there are neither.
+    """
+    file_path = table_file(folder, table, file_format)
+    if os.path.exists(file_path):
+        return [file_path]
+    return sorted(glob.glob(os.path.join(folder, table, f"part-*.{file_format}")))
+
+
+def file_checksums(file_path, prefix_bytes=0):
+    """
+    SHA-256 of the whole file and of its first `prefix_bytes` bytes, in one
+    pass. The prefix digest is None when the file is shorter than that.
+    """
+    digest = hashlib.sha256()
+    prefix_digest = None
+    remaining = prefix_bytes
+
+    with open(file_path, "rb") as f:
+        while True:
+            block = f.read(CHECKSUM_BLOCK_BYTES)
+            if not block:
+                break
+            if 0 < remaining <= len(block):
+                digest.update(block[:remaining])
+                prefix_digest = digest.hexdigest()
+                digest.update(block[remaining:])
+            else:
+                digest.update(block)
+            remaining -= len(block)
+
+    if prefix_bytes == 0:
+        prefix_digest = hashlib.sha256().hexdigest()
+    return digest.hexdigest(), prefix_digest
+
+
+def parts_checksum(file_paths):
+    """SHA-256 over the part files' names and checksums, and their total size."""
+    digest = hashlib.sha256()
+    for file_path in file_paths:
+        digest.update(os.path.basename(file_path).encode())
+        digest.update(file_checksums(file_path)[0].encode())
+    return digest.hexdigest(), sum(os.path.getsize(file_path) for file_path in file_paths)
+
+
+def get_load_state(engine, table):
+    """Last recorded load of `table` as a dict, or None."""
+    if not inspect(engine).has_table(load_state.name):
+        return None
+    with engine.connect() as conn:
+        row = conn.execute(
+            select(load_state).where(load_state.c.table_name == table)
+        ).mappings().first()
+    return dict(row) if row else None
+
+
+def save_load_state(engine, table, checksum, file_bytes, high_water_mark):
+    state_metadata.create_all(engine, tables=[load_state])
+    with engine.begin() as conn:
+        conn.execute(delete(load_state).where(load_state.c.table_name == table))
+        conn.execute(load_state.insert().values(
+            table_name=table,
+            file_checksum=checksum,
+            file_bytes=file_bytes,
+            high_water_mark=high_water_mark,
+            loaded_at=datetime.now(),
+        ))
+
+
+def max_key(engine, table):
+    """Current high-water mark of `table`, or None when it is empty."""
+    key = TABLE_KEYS[table]
+    with engine.connect() as conn:
+        value = conn.execute(select(func.max(column(key))).select_from(sql_table(table))).scalar()
+    return None if value is None else int(value)
+
+
+def record_load(engine, table, file_path):
+    """Remember the file that was just loaded so incremental runs can skip it."""
+    checksum, _ = file_checksums(file_path)
+    save_load_state(engine, table, checksum, os.path.getsize(file_path), max_key(engine, table))
+
+
+def _stats(rows, read_seconds, insert_seconds, status="loaded"):
+    seconds = read_seconds + insert_seconds
+    return {
+        "status": status,
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "read_seconds": round(read_seconds, 3),
+        "insert_seconds": round(insert_seconds, 3),
+        "rows_per_sec": round(rows / seconds) if seconds > 0 else rows,
+    }
+
+
+def create_table(engine, table):
+    """
+    Drop `table` if it exists and recreate it from its schema in tables.py,
+    with its primary key but without secondary indexes (see create_indexes).
+    """
+    schema = TABLE_SCHEMAS[table]
+    with engine.begin() as conn:
+        schema.drop(conn, checkfirst=True)
+        conn.execute(CreateTable(schema))
+
+
+def create_indexes(engine, table):
+    """Create the table's secondary indexes that do not exist yet; returns seconds taken."""
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        for index in TABLE_SCHEMAS[table].indexes:
+            index.create(conn, checkfirst=True)
+    return time.perf_counter() - start
+
+
+def load_table_replace(engine, table, file_path):
+    """Read the whole file and replace the table's rows in one to_sql call."""
+    start = time.perf_counter()
+    df = read_table_file(table, file_path)
+    read_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    create_table(engine, table)
+    df.to_sql(table, engine, if_exists="append", index=False)
+    return _stats(len(df), read_seconds, time.perf_counter() - start)
+
+
+def append_file(engine, table, file_path, chunk_rows=BULK_CHUNK_ROWS, high_water_mark=None):
+    """
+    Stream the file into the existing table in `chunk_rows` chunks, keeping
+    only rows above `high_water_mark` when given. Returns
+    (rows, read_seconds, insert_seconds).
+    """
+    rows = 0
+    read_seconds = 0.0
+    insert_seconds = 0.0
+
+    reader = read_table_file(table, file_path, chunksize=chunk_rows)
+    while True:
+        start = time.perf_counter()
+        chunk = next(reader, None)
+        if chunk is not None and high_water_mark is not None:
+            chunk = chunk[chunk[TABLE_KEYS[table]] > high_water_mark]
+        read_seconds += time.perf_counter() - start
+        if chunk is None:
+            break
+        if chunk.empty:
+            continue
+
+        start = time.perf_counter()
+        chunk.to_sql(table, engine, if_exists="append", index=False, chunksize=chunk_rows)
+        insert_seconds += time.perf_counter() - start
+        rows += len(chunk)
+
+    return rows, read_seconds, insert_seconds
+
+
+def load_table_bulk(engine, table, file_path, chunk_rows=BULK_CHUNK_ROWS):
+    """
+    Recreate the table and stream the file into it in `chunk_rows` chunks,
+    so only one chunk is in memory at a time.
+    """
+    start = time.perf_counter()
+    create_table(engine, table)
+    create_seconds = time.perf_counter() - start
+
+    rows, read_seconds, insert_seconds = append_file(engine, table, file_path, chunk_rows)
+    return _stats(rows, read_seconds, create_seconds + insert_seconds)
+
+
+def load_table_incremental(engine, table, file_path, chunk_rows=BULK_CHUNK_ROWS):
+    """
+    Append only rows with a key above the table's high-water mark; unchanged
+    files are skipped and a CSV that only grew is parsed from its old end.
+    """
+    start = time.perf_counter()
+    state = get_load_state(engine, table)
+    previous_bytes = state["file_bytes"] if state else 0
+    checksum, prefix_checksum = file_checksums(file_path, previous_bytes)
+    file_bytes = os.path.getsize(file_path)
+
+    if not inspect(engine).has_table(table):
+        stats = load_table_bulk(engine, table, file_path, chunk_rows)
+        save_load_state(engine, table, checksum, file_bytes, max_key(engine, table))
+        return stats
+
+    if state and checksum == state["file_checksum"]:
+        return _stats(0, time.perf_counter() - start, 0.0, status="unchanged")
+
+    high_water_mark = max_key(engine, table)
+    appended_only = (
+        state is not None
+        and file_path.endswith(".csv")
+        and prefix_checksum == state["file_checksum"]
+    )
+
+    rows = 0
+    read_seconds = time.perf_counter() - start
+    insert_seconds = 0.0
+
+    with open(file_path, "rb") as f:
+        if appended_only:
+            names = list(pd.read_csv(file_path, nrows=0).columns)
+            f.seek(previous_bytes)
+            reader = read_table_csv(table, f, chunksize=chunk_rows, names=names)
+        else:
+            reader = read_table_file(table, file_path, chunksize=chunk_rows)
+
+        while True:
+            t = time.perf_counter()
+            try:
+                chunk = next(reader, None)
+            except pd.errors.EmptyDataError:
+                chunk = None
+            if chunk is not None and high_water_mark is not None:
+                chunk = chunk[chunk[TABLE_KEYS[table]] > high_water_mark]
+            read_seconds += time.perf_counter() - t
+            if chunk is None:
+                break
+            if chunk.empty:
+                continue
+
+            t = time.perf_counter()
+            chunk.to_sql(table, engine, if_exists="append", index=False, chunksize=chunk_rows)
+            insert_seconds += time.perf_counter() - t
+            rows += len(chunk)
+
+    save_load_state(engine, table, checksum, file_bytes, max_key(engine, table))
+    return _stats(rows, read_seconds, insert_seconds, status="appended")
+
+
+def load_table_parts(engine, table, file_paths, mode, chunk_rows=BULK_CHUNK_ROWS, workers=1):
+    """
+    Load a sharded table's part files concurrently on `workers` threads;
+    read/insert seconds add up over the parts, `seconds` is wall time.
+    """
+    start = time.perf_counter()
+    checksum, file_bytes = parts_checksum(file_paths)
+    high_water_mark = None
+    status = "loaded"
+
+    if mode == "incremental" and inspect(engine).has_table(table):
+        state = get_load_state(engine, table)
+        if state and checksum == state["file_checksum"]:
+            return _stats(0, time.perf_counter() - start, 0.0, status="unchanged")
+        high_water_mark = max_key(engine, table)
+        status = "appended"
+    else:
+        create_table(engine, table)
+    setup_seconds = time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"etl-{table}") as pool:
+        parts = list(pool.map(
+            lambda file_path: append_file(engine, table, file_path, chunk_rows, high_water_mark),
+            file_paths,
+        ))
+    save_load_state(engine, table, checksum, file_bytes, max_key(engine, table))
+
+    rows = sum(part[0] for part in parts)
+    wall = time.perf_counter() - start
+    stats = _stats(rows, sum(part[1] for part in parts), setup_seconds + sum(part[2] for part in parts), status)
+    stats["seconds"] = round(wall, 3)
+    stats["rows_per_sec"] = round(rows / wall) if wall > 0 else rows
+    stats["parts"] = len(file_paths)
+    return stats
+
+
+def load_table(engine, table, data_folder, mode, chunk_rows=BULK_CHUNK_ROWS, file_format="csv", workers=1):
+    """
+    Load one table's file (or part files, on `workers` threads) with the
+    given mode and return its report entry.
+    """
+    file_paths = table_files(data_folder, table, file_format)
+    if not file_paths:
+        return "File missing"
+    file_path = file_paths[0]
+    if len(file_paths) > 1:
+        stats = load_table_parts(engine, table, file_paths, mode, chunk_rows, workers)
+    elif mode == "incremental":
+        stats = load_table_incremental(engine, table, file_path, chunk_rows)
+    else:
+        if mode == "bulk":
+            stats = load_table_bulk(engine, table, file_path, chunk_rows)
+        else:
+            stats = load_table_replace(engine, table, file_path)
+        record_load(engine, table, file_path)
+    stats["index_seconds"] = round(create_indexes(engine, table), 3)
+    return stats
+
+
+def run_load(engine, data_folder, mode="bulk", chunk_rows=BULK_CHUNK_ROWS, workers=1, file_format="csv",
+             build_aggregates=True):
+    """
+    Load every table file in data_folder on `workers` threads in foreign-key
+    order, then rebuild the KPI aggregates. Returns a per-table report; tables
+    that depend on a failed one are skipped.
+    """
+    if mode not in LOAD_MODES:
+        raise ValueError(f"Unknown load mode {mode!r}, expected one of {LOAD_MODES}")
+    if file_format not in FILE_FORMATS:
+        raise ValueError(f"Unknown file format {file_format!r}, expected one of {FILE_FORMATS}")
+
+    # Created up front so concurrent workers never race to create it
+    state_metadata.create_all(engine, tables=[load_state])
+
+    report = {}
+    waiting = list(TABLES)
+    loaded = set()
+    failed = set()
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="etl") as pool:
+        while waiting or running:
+            for table in list(waiting):
+                deps = TABLE_DEPENDENCIES[table]
+                blocked_by = [dep for dep in deps if dep in failed]
+                if blocked_by:
+                    waiting.remove(table)
+                    failed.add(table)
+                    report[table] = {"status": "skipped", "detail": f"Depends on failed table(s): {', '.join(blocked_by)}"}
+                elif all(dep in loaded for dep in deps):
+                    waiting.remove(table)
+                    running[pool.submit(
+                        load_table, engine, table, data_folder, mode, chunk_rows, file_format, workers
+                    )] = table
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                table = running.pop(future)
+                try:
+                    report[table] = future.result()
+                    loaded.add(table)
+                except Exception as e:
+                    report[table] = {"status": "error", "detail": str(e)}
+                    failed.add(table)
+
+    report = {table: report[table] for table in TABLES}
+    if build_aggregates:
+        report.update(build_kpi_aggregates(engine, report))
+    return report
@@ -0,0 +1,337 @@
+"""
+Real-time admission and discharge ingest, applied to the loaded tables and
+KPI aggregates in one serialized transaction per call. Bed occupancy is
+recounted from the active stays, capped at capacity like the generator's.
+"""
+import os
+import threading
+import time
+from datetime import timedelta
+
+import pandas as pd
+from metrics import record
+from sqlalchemy import Date, DateTime, Integer, String, and_, case, column, func, inspect, select, table, update
+from tables import TABLE_SCHEMAS
+
+import data_path  # noqa: F401
+from readmissions import READMISSION_WINDOW_DAYS, flag_readmissions  # noqa: E402
+
+ADMISSION_TYPES = ["Emergency", "Scheduled"]
+DEFAULT_SNAPSHOT_INTERVAL = timedelta(days=1)
+# Events further than this past the last snapshot are rejected, so one event
+# cannot make a call add snapshots for years while holding the ingest lock
+INGEST_HORIZON = timedelta(days=int(os.environ.get("HOSPITAL_INGEST_HORIZON_DAYS", 31)))
+
+admissions = TABLE_SCHEMAS["admissions"]
+departments = TABLE_SCHEMAS["departments"]
+bed_occupancy = TABLE_SCHEMAS["bed_occupancy"]
+
+admission_rollup = table(
+    "kpi_admission_rollup",
+    column("branch_id", Integer),
+    column("department_id", Integer),
+    column("admission_date", Date),
+    column("admissions", Integer),
+    column("emergency_admissions", Integer),
+    column("readmissions", Integer),
+    column("los_sum", Integer),
+    column("discharges", Integer),
+)
+
+admissions_hourly = table(
+    "kpi_admissions_hourly",
+    column("bucket_start", DateTime),
+    column("branch_id", Integer),
+    column("department_id", Integer),
+    column("admissions", Integer),
+    column("emergency_admissions", Integer),
+    column("readmissions", Integer),
+    column("los_sum", Integer),
+    column("discharges", Integer),
+)
+
+emergency_load = table(
+    "kpi_emergency_load",
+    column("day_of_week", String),
+    column("hour_of_day", Integer),
+    column("emergency_cases", Integer),
+)
+
+_lock = threading.Lock()
+
+
+class IngestError(ValueError):
+    pass
+
+
+def local_datetime(value):
+    """`value` as a naive local time; an aware datetime is converted to local time first."""
+    if value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def _require_tables(conn):
+    missing = [
+        name for name in (admissions.name, departments.name, bed_occupancy.name,
+                          admission_rollup.name, admissions_hourly.name, emergency_load.name)
+        if not inspect(conn).has_table(name)
+    ]
+    if missing:
+        raise IngestError(f"Tables not loaded yet ({', '.join(missing)}); run the ETL first")
+
+
+def _upsert(conn, target, key, increments):
+    """Add `increments` to the row of `target` matching `key`, inserting it when missing."""
+    where = and_(*(target.c[name] == value for name, value in key.items()))
+    result = conn.execute(
+        update(target).where(where).values({name: target.c[name] + value for name, value in increments.items()})
+    )
+    if result.rowcount == 0:
+        conn.execute(target.insert().values({**key, **increments}))
+
+
+def active_stays(conn, snapshot):
+    """department_id -> stays occupying a bed at `snapshot` (admitted by then, not yet discharged)."""
+    c = admissions.c
+    rows = conn.execute(
+        select(c.department_id, func.count())
+        .where(c.admission_datetime <= snapshot)
+        .where((c.discharge_datetime >= snapshot) | c.discharge_datetime.is_(None))
+        .group_by(c.department_id)
+    ).all()
+    return dict(rows)
+
+
+def extend_snapshots(conn, until):
+    """
+    Append bed_occupancy rows for every department, one loaded snapshot
+    interval apart, until a snapshot at or after `until` exists. Returns
+    rows added.
+    """
+    c = bed_occupancy.c
+    latest = conn.execute(select(func.max(c.snapshot_datetime))).scalar()
+    if latest is None or latest >= until:
+        return 0
+    if until - latest > INGEST_HORIZON:
+        raise IngestError(
+            f"Event at {until} is more than {INGEST_HORIZON.days} days after the last "
+            f"bed occupancy snapshot ({latest}); reload the data first"
+        )
+    previous = conn.execute(
+        select(func.max(c.snapshot_datetime)).where(c.snapshot_datetime < latest)
+    ).scalar()
+    interval = latest - previous if previous is not None else DEFAULT_SNAPSHOT_INTERVAL
+
+    current = conn.execute(
+        select(bed_occupancy).where(c.snapshot_datetime == latest).order_by(c.department_id)
+    ).mappings().all()
+    next_id = conn.execute(select(func.max(c.snapshot_id))).scalar() + 1
+
+    rows = []
+    snapshot = latest
+    while snapshot < until:
+        snapshot += interval
+        active = active_stays(conn, snapshot)
+        for row in current:
+            # Capped at capacity, like the generator's snapshots
+            occupied = min(active.get(row["department_id"], 0), row["total_beds"])
+            rate = round(occupied / row["total_beds"] * 100, 2) if row["total_beds"] > 0 else 0.0
+            rows.append({
+                **row, "snapshot_id": next_id, "snapshot_datetime": snapshot,
+                "occupied_beds": occupied, "occupancy_rate": rate,
+            })
+            next_id += 1
+    conn.execute(bed_occupancy.insert(), rows)
+    return len(rows)
+
+
+def recount_occupancy(conn, department_id, since):
+    """
+    Recount the department's snapshots from `since` on from the stays active
+    at each, capped at capacity like the generator's snapshots.
+    """
+    a = admissions.c
+    c = bed_occupancy.c
+    active = (
+        select(func.count())
+        .where(a.department_id == c.department_id)
+        .where(a.admission_datetime <= c.snapshot_datetime)
+        .where((a.discharge_datetime >= c.snapshot_datetime) | a.discharge_datetime.is_(None))
+        .scalar_subquery()
+    )
+    occupied = case((active > c.total_beds, c.total_beds), else_=active)
+    rate = case((c.total_beds <= 0, 0.0), else_=func.round(occupied * 100.0 / c.total_beds, 2))
+    conn.execute(
+        update(bed_occupancy)
+        .where(c.department_id == department_id, c.snapshot_datetime >= since)
+        .values(occupied_beds=occupied, occupancy_rate=rate)
+    )
+
+
+def last_discharges(conn, patient_ids):
+    """patient_id -> discharge_datetime of each patient's latest admission (NaT while still admitted)."""
+    c = admissions.c
+    latest = (
+        select(c.patient_id, func.max(c.admission_datetime).label("admission_datetime"))
+        .where(c.patient_id.in_(patient_ids))
+        .group_by(c.patient_id)
+        .subquery()
+    )
+    rows = conn.execute(
+        select(c.patient_id, c.discharge_datetime)
+        .join(latest, and_(c.patient_id == latest.c.patient_id, c.admission_datetime == latest.c.admission_datetime))
+    ).all()
+    if not rows:
+        return pd.Series(dtype="datetime64[ns]")
+    df = pd.DataFrame(rows, columns=["patient_id", "discharge_datetime"])
+    df["discharge_datetime"] = pd.to_datetime(df["discharge_datetime"])
+    return df.groupby("patient_id")["discharge_datetime"].max()
+
+
+def ingest_admissions(engine, events, window_days=READMISSION_WINDOW_DAYS):
+    """
+    Apply admission events (dicts with patient_id, department_id, doctor_id,
+    admission_datetime and admission_type) and return the new admissions'
+    ids and readmission flags, in event order.
+    """
+    if not events:
+        return []
+    for event in events:
+        if event["admission_type"] not in ADMISSION_TYPES:
+            raise IngestError(f"Unknown admission_type {event['admission_type']!r}, expected one of {ADMISSION_TYPES}")
+    events = [{**event, "admission_datetime": local_datetime(event["admission_datetime"])} for event in events]
+
+    start = time.perf_counter()
+    with _lock, engine.begin() as conn:
+        _require_tables(conn)
+        department_ids = sorted({event["department_id"] for event in events})
+        known = {
+            row.department_id: row
+            for row in conn.execute(select(departments).where(departments.c.department_id.in_(department_ids)))
+        }
+        unknown = [d for d in department_ids if d not in known]
+        if unknown:
+            raise IngestError(f"Unknown department_id(s): {', '.join(map(str, unknown))}")
+
+        # Ids follow admission time; results keep event order (the index)
+        new = pd.DataFrame(events)
+        new["admission_datetime"] = pd.to_datetime(new["admission_datetime"])
+        new = new.sort_values("admission_datetime", kind="stable")
+        new["discharge_datetime"] = pd.NaT
+        previous = last_discharges(conn, [int(p) for p in new["patient_id"].unique()])
+        new["is_readmission"] = flag_readmissions(new, window_days, previous)
+
+        first_id = (conn.execute(select(func.max(admissions.c.admission_id))).scalar() or 0) + 1
+        extend_snapshots(conn, new["admission_datetime"].max())
+
+        created = {}
+        recount_from = {}
+        for offset, (position, event) in enumerate(zip(new.index, new.itertuples(index=False))):
+            department = known[event.department_id]
+            admitted = event.admission_datetime.to_pydatetime()
+            row = {
+                "admission_id": first_id + offset,
+                "patient_id": int(event.patient_id),
+                "department_id": int(event.department_id),
+                "department_name": department.department_name,
+                "branch_id": department.branch_id,
+                "doctor_id": int(event.doctor_id),
+                "admission_datetime": admitted,
+                "discharge_datetime": None,
+                "admission_type": event.admission_type,
+                "length_of_stay": None,
+                "is_readmission": int(event.is_readmission),
+            }
+            conn.execute(admissions.insert().values(row))
+
+            recount_from[row["department_id"]] = min(recount_from.get(row["department_id"], admitted), admitted)
+            emergency = int(row["admission_type"] == "Emergency")
+            counters = {
+                "admissions": 1, "emergency_admissions": emergency,
+                "readmissions": row["is_readmission"], "los_sum": 0, "discharges": 0,
+            }
+            _upsert(conn, admission_rollup, {
+                "branch_id": row["branch_id"],
+                "department_id": row["department_id"],
+                "admission_date": admitted.date(),
+            }, counters)
+            _upsert(conn, admissions_hourly, {
+                "bucket_start": admitted.replace(minute=0, second=0, microsecond=0),
+                "branch_id": row["branch_id"],
+                "department_id": row["department_id"],
+            }, counters)
+            if emergency:
+                _upsert(conn, emergency_load, {
+                    "day_of_week": admitted.strftime("%A"), "hour_of_day": admitted.hour,
+                }, {"emergency_cases": 1})
+            created[position] = {k: row[k] for k in ("admission_id", "patient_id", "is_readmission")}
+
+        for department_id, since in recount_from.items():
+            recount_occupancy(conn, department_id, since)
+
+    record("db_seconds", time.perf_counter() - start)
+    return [created[position] for position in range(len(events))]
+
+
+def ingest_discharges(engine, events):
+    """
+    Apply discharge events (dicts with admission_id and discharge_datetime)
+    and return each admission's id and length_of_stay, in event order.
+    """
+    if not events:
+        return []
+    events = [{**event, "discharge_datetime": local_datetime(event["discharge_datetime"])} for event in events]
+
+    start = time.perf_counter()
+    with _lock, engine.begin() as conn:
+        _require_tables(conn)
+        ids = [event["admission_id"] for event in events]
+        stays = {
+            row.admission_id: row
+            for row in conn.execute(select(admissions).where(admissions.c.admission_id.in_(ids)))
+        }
+        unknown = [i for i in ids if i not in stays]
+        if unknown:
+            raise IngestError(f"Unknown admission_id(s): {', '.join(map(str, unknown))}")
+        if len(set(ids)) < len(ids):
+            raise IngestError("An admission_id appears more than once in the batch")
+        closed = [i for i in ids if stays[i].discharge_datetime is not None]
+        if closed:
+            raise IngestError(f"Admission(s) already discharged: {', '.join(map(str, closed))}")
+
+        extend_snapshots(conn, max(event["discharge_datetime"] for event in events))
+
+        discharged = []
+        recount_from = {}
+        for event in events:
+            stay = stays[event["admission_id"]]
+            discharge = event["discharge_datetime"]
+            if discharge < stay.admission_datetime:
+                raise IngestError(f"Admission {stay.admission_id} cannot be discharged before it started")
+            length_of_stay = (discharge - stay.admission_datetime).days
+
+            conn.execute(
+                update(admissions)
+                .where(admissions.c.admission_id == stay.admission_id)
+                .values(discharge_datetime=discharge, length_of_stay=length_of_stay)
+            )
+            recount_from[stay.department_id] = min(recount_from.get(stay.department_id, discharge), discharge)
+            counters = {"los_sum": length_of_stay, "discharges": 1}
+            _upsert(conn, admission_rollup, {
+                "branch_id": stay.branch_id,
+                "department_id": stay.department_id,
+                "admission_date": stay.admission_datetime.date(),
+            }, counters)
+            _upsert(conn, admissions_hourly, {
+                "bucket_start": stay.admission_datetime.replace(minute=0, second=0, microsecond=0),
+                "branch_id": stay.branch_id,
+                "department_id": stay.department_id,
+            }, counters)
+            discharged.append({"admission_id": stay.admission_id, "length_of_stay": length_of_stay})
+
+        for department_id, since in recount_from.items():
+            recount_occupancy(conn, department_id, since)
+
+    record("db_seconds", time.perf_counter() - start)
+    return discharged
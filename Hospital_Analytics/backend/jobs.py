@@ -0,0 +1,77 @@
+"""
+Background ETL jobs, run one at a time on a single worker thread so two
+loads never write the same tables concurrently.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_STATUSES = ["queued", "running", "finished", "failed"]
+
+
+class JobRegistry:
+    """Runs submitted callables in order and keeps the last `history` job records."""
+
+    def __init__(self, history=20):
+        self.history = history
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="etl-job")
+
+    def submit(self, fn, **params):
+        """Queue fn(**params) and return the new job's record."""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "status": "queued",
+                "params": params,
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "detail": None,
+            }
+            self._trim()
+            record = dict(self._jobs[job_id])
+        self._executor.submit(self._run, job_id, fn, params)
+        return record
+
+    def _run(self, job_id, fn, params):
+        self._update(job_id, status="running", started_at=time.time())
+        try:
+            result = fn(**params)
+        except Exception as e:
+            self._update(job_id, status="failed", detail=str(e), finished_at=time.time())
+        else:
+            status = "failed" if result.get("status") == "Error" else "finished"
+            self._update(job_id, status=status, result=result, finished_at=time.time())
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def _trim(self):
+        # Drop the oldest completed jobs; queued/running ones are always kept
+        done = [j for j, r in self._jobs.items() if r["status"] in ("finished", "failed")]
+        for job_id in done[:max(len(self._jobs) - self.history, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            record = self._jobs.get(job_id)
+            return dict(record) if record is not None else None
+
+    def list(self):
+        """Job records, most recent first, without their load reports."""
+        with self._lock:
+            return [
+                {k: v for k, v in record.items() if k != "result"}
+                for record in reversed(self._jobs.values())
+            ]
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
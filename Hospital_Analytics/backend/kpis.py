@@ -0,0 +1,56 @@
+"""
+KPI queries over the aggregate tables, and fetch_records, which returns
+rows straight from the DBAPI cursor as dicts.
+"""
+import time
+
+from metrics import record
+from sqlalchemy import text
+
+SUMMARY_QUERY = """
+SELECT
+    SUM(admissions) AS total_admissions,
+    SUM(los_sum) * 1.0 / NULLIF(SUM(discharges), 0) AS avg_los,
+    SUM(emergency_admissions) * 100.0 / SUM(admissions) AS emergency_pct,
+    SUM(readmissions) * 100.0 / SUM(admissions) AS readmission_rate
+FROM kpi_admission_rollup
+"""
+
+EMERGENCY_LOAD_QUERY = """
+SELECT
+    day_of_week,
+    hour_of_day,
+    emergency_cases
+FROM kpi_emergency_load
+ORDER BY emergency_cases DESC
+"""
+
+DOCTOR_UTILIZATION_QUERY = """
+SELECT
+    doctor_name,
+    department_name,
+    available_hours,
+    actual_hours_spent,
+    utilization_pct
+FROM kpi_doctor_utilization
+"""
+
+KPI_QUERIES = {
+    "summary": SUMMARY_QUERY,
+    "emergency-load": EMERGENCY_LOAD_QUERY,
+    "doctor-utilization": DOCTOR_UTILIZATION_QUERY,
+}
+
+
+def fetch_records(engine, query, params=None):
+    """Rows of `query` as a list of dicts, read directly from the cursor."""
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        connected = time.perf_counter()
+        result = conn.execute(text(query), params or {})
+        columns = list(result.keys())
+        rows = [dict(zip(columns, row)) for row in result.fetchall()]
+    record("pool_wait_seconds", connected - start)
+    record("db_seconds", time.perf_counter() - connected)
+    record("rows", len(rows))
+    return rows
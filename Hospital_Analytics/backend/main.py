@@ -1,145 +1,415 @@
-from fastapi import FastAPI, HTTPException
-import pandas as pd
-from sqlalchemy import create_engine
-from sqlalchemy import text
-import urllib
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import asyncio
+import contextvars
+from datetime import date, datetime
+from typing import List, Optional, Union
+from pydantic import BaseModel
 import os
+import time
 
-app = FastAPI(title="Hospital Analytics Backend")
-
-# ========================================
-# DATABASE CONFIGURATION
-# ========================================
-# 1. PASTE YOUR SERVER NAME HERE
-SERVER_NAME = "LAPTOP-A27GM7FS\\SQLEXPRESS"
-DATABASE_NAME = "HospitalAnalytics"
-
-# ODBC Driver 17 is usually standard with SSMS 2022.
-# If it fails, try "ODBC Driver 18 for SQL Server"
-DRIVER = "ODBC Driver 17 for SQL Server"
-
-connection_string = (
-    f"DRIVER={{{DRIVER}}};"
-    f"SERVER={SERVER_NAME};"
-    f"DATABASE={DATABASE_NAME};"
-    "Trusted_Connection=yes;"
-    "Encrypt=no;"  # Required for some local SQL 2022 setups
+from bed_alerts import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, STREAM_PAGE_ROWS, InvalidCursor, decode_cursor, fetch_alerts_page,
 )
+from cache import TTLCache, cached
+from database import QUERY_BACKEND, SINGLE_WRITER, Engines
+from jobs import JobRegistry
+from trends import TREND_BUCKETS, fetch_trend
+import metrics
+from kpis import DOCTOR_UTILIZATION_QUERY, EMERGENCY_LOAD_QUERY, SUMMARY_QUERY, fetch_records
+from responses import FastJSONResponse, dumps
 
-quoted_conn = urllib.parse.quote_plus(connection_string)
-engine = create_engine(f"mssql+pyodbc:///?odbc_connect={quoted_conn}")
+# The ETL, ingest and memory backend modules (and with them pandas) are
+# imported by the endpoints that use them, so importing the app stays cheap.
+# Connection settings live in database.py.
 
+CSV_FOLDER = os.environ.get("HOSPITAL_CSV_FOLDER", r"D:\Hospital_analytics\data\csv_data")
 
-@app.post("/etl/run-load")
-def run_etl():
+# File format loaded at startup by the memory backend
+MEMORY_FILE_FORMAT = os.environ.get("HOSPITAL_MEMORY_FILE_FORMAT", "csv")
+
+# Tables load concurrently on this many threads, each holding one pooled
+# connection (SQLite takes one writer at a time)
+ETL_WORKERS = 1 if SINGLE_WRITER else 4
+
+# KPI queries run on their own bounded thread pool so they never queue
+# behind ETL work or block the event loop
+KPI_QUERY_WORKERS = 8
+
+# Ingest events are applied one call at a time, in arrival order
+INGEST_WORKERS = 1
+
+# One pooled connection per KPI, ingest and ETL thread
+DB_POOL_SIZE = KPI_QUERY_WORKERS + INGEST_WORKERS + ETL_WORKERS
+
+# The engine opens on first use, or at startup in lifespan() below
+engines = Engines(DB_POOL_SIZE, CSV_FOLDER, MEMORY_FILE_FORMAT)
+
+ALERT_FORMATS = ["json", "ndjson"]
+
+# Finished ETL jobs kept for GET /etl/jobs
+ETL_JOB_HISTORY = 20
+
+
+def open_workers():
+    """Create the KPI and ingest thread pools and the ETL job queue."""
+    global kpi_executor, ingest_executor, etl_jobs
+    kpi_executor = ThreadPoolExecutor(max_workers=KPI_QUERY_WORKERS, thread_name_prefix="kpi-db")
+    ingest_executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="ingest")
+    etl_jobs = JobRegistry(history=ETL_JOB_HISTORY)
+
+
+def close_workers():
+    """Let queued ETL jobs, ingest calls and KPI queries finish, then stop their threads."""
+    etl_jobs.shutdown(wait=True)
+    ingest_executor.shutdown(wait=True)
+    kpi_executor.shutdown(wait=True)
+
+
+# Also opened at import, so the app serves without its lifespan (benchmarks)
+open_workers()
+
+
+@asynccontextmanager
+async def lifespan(app):
     """
-    EXTRACT: From CSV
-    LOAD: Into SQL Server 2022
-    This fulfills the Backend/ETL requirement.
+    Open the workers and the engine (pre-warming its pool) before the first
+    request; on shutdown stop the workers, then close the engine
     """
-    csv_folder = r"D:\Hospital_analytics\data\csv_data"
-    # Order matters for foreign keys, though 'replace' handles it loosely
-    tables = [
-        "branches", "departments", "doctors", "patients",
-        "admissions", "procedures", "billing", "outcomes", "bed_occupancy"
-    ]
+    loop = asyncio.get_running_loop()
+    open_workers()
+    # Connecting and loading block, keep them off the event loop
+    await loop.run_in_executor(None, engines.prewarm)
+    yield
+    await loop.run_in_executor(None, close_workers)
+    engines.dispose()
 
-    report = {}
 
-    if not os.path.exists(csv_folder):
-        raise HTTPException(status_code=404, detail="CSV folder not found. Run Step 1 first!")
+app = FastAPI(title="Hospital Analytics Backend", lifespan=lifespan)
+
+# KPI results are served from memory until they expire or the next ETL load
+KPI_CACHE_TTL_SECONDS = 300
+KPI_CACHE_SIZE = 128
+kpi_cache = TTLCache(maxsize=KPI_CACHE_SIZE, ttl=KPI_CACHE_TTL_SECONDS)
+
+
+class AdmissionEvent(BaseModel):
+    patient_id: int
+    department_id: int
+    doctor_id: int
+    admission_datetime: datetime
+    admission_type: str
+
+
+class DischargeEvent(BaseModel):
+    admission_id: int
+    discharge_datetime: datetime
+
+
+@cached(kpi_cache)
+async def read_records(query):
+    """Run a KPI query on the KPI executor and return its rows as dicts."""
+    loop = asyncio.get_running_loop()
+    # Copy the request context so the query's timings reach the metrics middleware
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(kpi_executor, context.run, lambda: fetch_records(engines.get(), query))
+
+
+def etl_job(mode, workers, file_format):
+    """Body of a background ETL job; the returned dict becomes the job result."""
+    from etl import run_load
+    from memory_backend import load_memory_engine
 
     try:
-        for table in tables:
-            file_path = os.path.join(csv_folder, f"{table}.csv")
-            if os.path.exists(file_path):
-                # Load CSV
-                df = pd.read_csv(file_path)
-
-                # Load to SQL Server
-                # 'replace' will drop existing tables and recreate them
-                df.to_sql(table, engine, if_exists="replace", index=False)
-                report[table] = f"Successfully loaded {len(df)} rows"
+        start = time.perf_counter()
+        if QUERY_BACKEND == "memory":
+            # Load a fresh database and switch to it only if every table loaded
+            new_engine, report = load_memory_engine(CSV_FOLDER, file_format)
+            mode = "replace"
+        else:
+            report = run_load(engines.get(), CSV_FOLDER, mode=mode, workers=workers, file_format=file_format)
+        failed = any(isinstance(r, dict) and r["status"] in ("error", "skipped") for r in report.values())
+        if QUERY_BACKEND == "memory":
+            if failed:
+                new_engine.dispose()
             else:
-                report[table] = "File missing"
-
-        return {"status": "Success", "data": report}
+                # Free the replaced in-memory database
+                previous = engines.swap(new_engine)
+                if previous is not None:
+                    previous.dispose()
+        wall_seconds = time.perf_counter() - start
+        metrics.observe_etl(mode, wall_seconds, report)
+        return {
+            "status": "Error" if failed else "Success",
+            "mode": mode,
+            "file_format": file_format,
+            "workers": workers,
+            "wall_seconds": round(wall_seconds, 3),
+            "index_seconds": round(sum(
+                r.get("index_seconds", 0.0) for r in report.values() if isinstance(r, dict)
+            ), 3),
+            "data": report,
+        }
 
     except Exception as e:
         return {"status": "Error", "detail": str(e)}
+
+    finally:
+        # Even a failed load may have replaced some tables
+        kpi_cache.clear()
+
+
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    """
+    Per-endpoint latency, DB, pool-wait, serialization and row metrics
+    (see metrics.py), labelled with the route template
+    """
+    stats = metrics.begin_request()
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    metrics.observe_request(
+        request.method, route.path if route else "unmatched",
+        response.status_code, time.perf_counter() - start, stats,
+    )
+    return response
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    Request, connection pool and ETL metrics in Prometheus text format
+    """
+    # Only an open engine has pool stats; never open one just to report them
+    engine = engines.current()
+    if engine is not None:
+        metrics.observe_pool(engine.pool)
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/etl/run-load", status_code=202)
+async def run_etl(mode: str = "bulk", workers: int = ETL_WORKERS, file_format: str = "csv"):
+    """
+    EXTRACT: From CSV or Parquet (mode=bulk, replace or incremental)
+    LOAD: Into SQL Server 2022, as a background job polled at /etl/jobs/{job_id}
+    This fulfills the Backend/ETL requirement.
+    """
+    from etl import FILE_FORMATS, LOAD_MODES
+
+    if not os.path.exists(CSV_FOLDER):
+        raise HTTPException(status_code=404, detail="CSV folder not found. Run Step 1 first!")
+    if mode not in LOAD_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown mode '{mode}'. Use one of {LOAD_MODES}")
+    if file_format not in FILE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown file_format '{file_format}'. Use one of {FILE_FORMATS}")
+    if not 1 <= workers <= ETL_WORKERS:
+        raise HTTPException(status_code=400, detail=f"workers must be between 1 and {ETL_WORKERS}")
+
+    job = etl_jobs.submit(etl_job, mode=mode, workers=workers, file_format=file_format)
+    job["status_url"] = f"/etl/jobs/{job['job_id']}"
+    return job
+
+
+@app.get("/etl/jobs")
+async def list_etl_jobs():
+    """
+    Recent ETL jobs, most recent first
+    """
+    return etl_jobs.list()
+
+
+@app.get("/etl/jobs/{job_id}")
+async def get_etl_job(job_id: str):
+    """
+    Status of one ETL job; `result` holds the load report once it has finished
+    """
+    job = etl_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ETL job '{job_id}'")
+    return job
+
+
+async def run_ingest(ingest, events):
+    """Apply events on the ingest executor, then drop the cached KPI results they changed."""
+    from ingest import IngestError
+
+    events = [event.model_dump() for event in (events if isinstance(events, list) else [events])]
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    try:
+        return await loop.run_in_executor(ingest_executor, context.run, lambda: ingest(engines.get(), events))
+    except IngestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        kpi_cache.clear()
+
+
+@app.post("/ingest/admissions")
+async def post_admissions(events: Union[AdmissionEvent, List[AdmissionEvent]]):
+    """
+    Record one admission event or a batch of them as open stays, counted in
+    bed occupancy and the KPIs straight away; returns the new admission ids
+    """
+    from ingest import ingest_admissions
+
+    return await run_ingest(ingest_admissions, events)
+
+
+@app.post("/ingest/discharges")
+async def post_discharges(events: Union[DischargeEvent, List[DischargeEvent]]):
+    """Record one discharge event or a batch of them, closing each stay"""
+    from ingest import ingest_discharges
+
+    return await run_ingest(ingest_discharges, events)
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """
+    Hit/miss counters of the KPI result cache
+    """
+    return kpi_cache.stats()
+
 @app.get("/kpis/summary")
-def kpi_summary():
+async def kpi_summary():
     """
     Executive-level KPIs for hospital performance
+    (from the kpi_admission_rollup table built by the ETL)
     """
-    query = """
-    SELECT
-        COUNT(*) AS total_admissions,
-        AVG(length_of_stay) AS avg_los,
-        SUM(CASE WHEN admission_type = 'Emergency' THEN 1 ELSE 0 END) * 100.0 / COUNT(*) AS emergency_pct,
-        SUM(CASE WHEN is_readmission = 1 THEN 1 ELSE 0 END) * 100.0 / COUNT(*) AS readmission_rate
-    FROM admissions
-    """
-    df = pd.read_sql(query, engine)
-    return df.to_dict(orient="records")[0]
+    return FastJSONResponse((await read_records(SUMMARY_QUERY))[0])
 
 @app.get("/kpis/bed-alerts")
-def bed_occupancy_alerts():
-    """
-    Flags departments with critical bed occupancy (>90%)
-    """
-    query = """
-    SELECT
-        department_name,
-        branch_id,
-        snapshot_datetime,
-        occupancy_rate
-    FROM bed_occupancy
-    WHERE occupancy_rate > 90
-    ORDER BY occupancy_rate DESC
-    """
-    df = pd.read_sql(query, engine)
-    return df.to_dict(orient="records")
+async def bed_occupancy_alerts(
+    branch_id: Optional[int] = None,
+    department_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    format: str = "json",
+):
+    """
+    Flags departments with critical bed occupancy (>90%), filtered by branch,
+    department and dates: one page per `cursor` (format=json), or every
+    matching row as NDJSON (format=ndjson)
+    """
+    if format not in ALERT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{format}'. Use one of {ALERT_FORMATS}")
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    filters = dict(
+        branch_id=branch_id, department_id=department_id,
+        start_date=start_date, end_date=end_date, cursor=cursor,
+    )
+    if cursor is not None:
+        try:
+            decode_cursor(cursor)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    if format == "ndjson":
+        return StreamingResponse(alert_lines(limit, **filters), media_type="application/x-ndjson")
+    return FastJSONResponse(await bed_alerts_page(limit or DEFAULT_PAGE_SIZE, **filters))
+
+
+async def alert_lines(limit, **filters):
+    """
+    NDJSON lines of the matching alerts, fetched in keyset pages on the KPI
+    executor; the connection goes back to the pool between pages.
+    """
+    loop = asyncio.get_running_loop()
+    remaining = limit
+    while remaining is None or remaining > 0:
+        page_rows = STREAM_PAGE_ROWS if remaining is None else min(remaining, STREAM_PAGE_ROWS)
+        page = await loop.run_in_executor(
+            kpi_executor, lambda rows=page_rows, f=dict(filters): fetch_alerts_page(engines.get(), rows, **f)
+        )
+        yield b"".join(dumps(row) + b"\n" for row in page["items"])
+        if page["next_cursor"] is None:
+            break
+        filters["cursor"] = page["next_cursor"]
+        if remaining is not None:
+            remaining -= len(page["items"])
+
+
+@cached(kpi_cache)
+async def bed_alerts_page(limit, **filters):
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        kpi_executor, context.run, lambda: fetch_alerts_page(engines.get(), limit, **filters)
+    )
+
+
 @app.get("/kpis/emergency-load")
-def emergency_load():
+async def emergency_load():
     """
     Emergency department pressure analysis
+    (from the kpi_emergency_load table built by the ETL)
     """
-    query = """
-    SELECT
-        DATENAME(WEEKDAY, admission_datetime) AS day_of_week,
-        DATEPART(HOUR, admission_datetime) AS hour_of_day,
-        COUNT(*) AS emergency_cases
-    FROM admissions
-    WHERE admission_type = 'Emergency'
-    GROUP BY
-        DATENAME(WEEKDAY, admission_datetime),
-        DATEPART(HOUR, admission_datetime)
-    ORDER BY emergency_cases DESC
-    """
-    df = pd.read_sql(query, engine)
-    return df.to_dict(orient="records")
+    return FastJSONResponse(await read_records(EMERGENCY_LOAD_QUERY))
 @app.get("/kpis/doctor-utilization")
-def doctor_utilization():
+async def doctor_utilization():
     """
     Doctor workload and utilization based on procedures
+    (from the kpi_doctor_utilization table built by the ETL)
     """
-    query = """
-    SELECT
-        doc.doctor_name,
-        dept.department_name,
-        doc.available_hours,
-        SUM(pr.duration_minutes) / 60.0 AS actual_hours_spent,
-        (SUM(pr.duration_minutes) / 60.0 / NULLIF(doc.available_hours, 0)) * 100 AS utilization_pct
-    FROM doctors doc
-    JOIN departments dept ON doc.department_id = dept.department_id
-    LEFT JOIN procedures pr ON doc.doctor_id = pr.doctor_id
-    GROUP BY doc.doctor_name, dept.department_name, doc.available_hours
-    """
-    df = pd.read_sql(query, engine)
-    return df.to_dict(orient="records")
+    return FastJSONResponse(await read_records(DOCTOR_UTILIZATION_QUERY))
+
+@cached(kpi_cache)
+async def trend_rows(trend, bucket, **filters):
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        kpi_executor, context.run, lambda: fetch_trend(engines.get(), trend, bucket, **filters)
+    )
+
+
+async def trend_response(trend, bucket, branch_id, department_id, start_date, end_date):
+    if bucket not in TREND_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Unknown bucket '{bucket}'. Use one of {TREND_BUCKETS}")
+    if start_date is not None and end_date is not None and end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    return FastJSONResponse(await trend_rows(
+        trend, bucket,
+        branch_id=branch_id, department_id=department_id, start_date=start_date, end_date=end_date,
+    ))
+
+
+@app.get("/kpis/trends/emergency-load")
+async def emergency_load_trend(
+    bucket: str = "day",
+    branch_id: Optional[int] = None,
+    department_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+):
+    """
+    Admissions, emergency admissions (count and %) and readmissions per
+    hour, day, week or month (from the kpi_admissions_hourly table)
+    """
+    return await trend_response("emergency-load", bucket, branch_id, department_id, start_date, end_date)
+
+
+@app.get("/kpis/trends/occupancy")
+async def occupancy_trend(
+    bucket: str = "day",
+    branch_id: Optional[int] = None,
+    department_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+):
+    """
+    Overall and highest department bed occupancy rate per hour, day, week
+    or month
+    """
+    return await trend_response("occupancy", bucket, branch_id, department_id, start_date, end_date)
+
 
 @app.get("/")
-def home():
+async def home():
     return {"message": "Hospital API is online"}
 
@@ -0,0 +1,28 @@
+"""
+In-memory query backend (HOSPITAL_QUERY_BACKEND=memory): the generator's
+files are loaded with the regular ETL into an in-process SQLite database
+that serves every endpoint, so no SQL Server is needed.
+"""
+from sqlalchemy import create_engine
+
+from database import SerializedStaticPool
+from etl import run_load
+
+
+def memory_engine():
+    """Empty in-memory SQLite engine usable from any thread."""
+    return create_engine(
+        "sqlite://",
+        poolclass=SerializedStaticPool,
+        connect_args={"check_same_thread": False},
+    )
+
+
+def load_memory_engine(data_folder, file_format="csv"):
+    """
+    New in-memory engine loaded from data_folder, and the load report.
+    Tables load one at a time since they share the one connection.
+    """
+    engine = memory_engine()
+    report = run_load(engine, data_folder, mode="bulk", workers=1, file_format=file_format)
+    return engine, report
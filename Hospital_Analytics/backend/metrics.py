@@ -0,0 +1,193 @@
+"""
+Request and ETL metrics in the Prometheus text exposition format; code on
+the request path adds timings to the per-request stats dict with record().
+"""
+import bisect
+import threading
+from contextvars import ContextVar
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (1, 10, 100, 1000, 10_000, 100_000, 1_000_000)
+
+
+def _labels(labelnames, labels):
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values)) + (extra or [])
+    if not pairs:
+        return ""
+    escaped = (
+        name + '="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            for values, value in sorted(self._values.items()):
+                lines.extend(self._render_sample(values, value))
+        return lines
+
+    def _render_sample(self, values, value):
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {value}"]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = _labels(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_labels(self.labelnames, labels)] = value
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = _labels(self.labelnames, labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket counts (last one is +Inf), sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    def _render_sample(self, values, state):
+        counts, total = state
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, [("le", bound)])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {total}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Request latency by endpoint", ["method", "path", "status"]))
+DB_QUERY_SECONDS = REGISTRY.register(Histogram(
+    "http_db_query_seconds", "Time spent executing queries and fetching rows per request", ["path"]))
+POOL_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "http_db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection per request", ["path"]))
+SERIALIZE_SECONDS = REGISTRY.register(Histogram(
+    "http_serialize_seconds", "Time spent rendering the response body per request", ["path"]))
+ROWS_RETURNED = REGISTRY.register(Histogram(
+    "http_db_rows", "Rows fetched from the database per request", ["path"], buckets=ROW_BUCKETS))
+
+POOL_CHECKED_OUT = REGISTRY.register(Gauge(
+    "db_pool_checked_out", "Connections currently checked out of the pool"))
+POOL_SIZE = REGISTRY.register(Gauge(
+    "db_pool_size", "Configured pool size"))
+POOL_OVERFLOW = REGISTRY.register(Gauge(
+    "db_pool_overflow", "Connections open beyond the pool size"))
+
+ETL_TABLE_SECONDS = REGISTRY.register(Gauge(
+    "etl_table_seconds", "Duration of the last load of each table by phase", ["table", "phase"]))
+ETL_TABLE_ROWS = REGISTRY.register(Gauge(
+    "etl_table_rows", "Rows written by the last load of each table", ["table"]))
+ETL_TABLE_LOADS = REGISTRY.register(Counter(
+    "etl_table_loads_total", "Table loads by outcome", ["table", "status"]))
+ETL_RUN_SECONDS = REGISTRY.register(Histogram(
+    "etl_run_seconds", "Wall time of ETL jobs", ["mode"], buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)))
+
+_request_stats = ContextVar("request_stats", default=None)
+
+
+def begin_request():
+    """Start collecting record() calls for the current request; returns the stats dict."""
+    stats = {}
+    _request_stats.set(stats)
+    return stats
+
+
+def record(name, value):
+    """Add `value` to `name` in the current request's stats (no-op outside a request)."""
+    stats = _request_stats.get()
+    if stats is not None:
+        stats[name] = stats.get(name, 0) + value
+
+
+def observe_request(method, path, status, seconds, stats):
+    REQUEST_SECONDS.observe(seconds, method=method, path=path, status=status)
+    if "db_seconds" in stats:
+        DB_QUERY_SECONDS.observe(stats["db_seconds"], path=path)
+    if "pool_wait_seconds" in stats:
+        POOL_WAIT_SECONDS.observe(stats["pool_wait_seconds"], path=path)
+    if "serialize_seconds" in stats:
+        SERIALIZE_SECONDS.observe(stats["serialize_seconds"], path=path)
+    if "rows" in stats:
+        ROWS_RETURNED.observe(stats["rows"], path=path)
+
+
+def observe_pool(pool):
+    """Snapshot a QueuePool's state into the pool gauges (other pools have no counters)."""
+    if hasattr(pool, "checkedout"):
+        POOL_CHECKED_OUT.set(pool.checkedout())
+    if hasattr(pool, "size"):
+        POOL_SIZE.set(pool.size())
+    if hasattr(pool, "overflow"):
+        POOL_OVERFLOW.set(max(pool.overflow(), 0))
+
+
+def observe_etl(mode, wall_seconds, report):
+    ETL_RUN_SECONDS.observe(wall_seconds, mode=mode)
+    for table, entry in report.items():
+        if not isinstance(entry, dict):
+            ETL_TABLE_LOADS.inc(table=table, status=entry)
+            continue
+        ETL_TABLE_LOADS.inc(table=table, status=entry["status"])
+        for phase in ("read", "insert", "index"):
+            if f"{phase}_seconds" in entry:
+                ETL_TABLE_SECONDS.set(entry[f"{phase}_seconds"], table=table, phase=phase)
+        if "seconds" in entry and not any(f"{p}_seconds" in entry for p in ("read", "insert")):
+            ETL_TABLE_SECONDS.set(entry["seconds"], table=table, phase="build")
+        if "rows" in entry:
+            ETL_TABLE_ROWS.set(entry["rows"], table=table)
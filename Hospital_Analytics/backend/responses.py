@@ -0,0 +1,41 @@
+"""
+Fast JSON responses rendered with orjson when installed (stdlib json
+otherwise), skipping FastAPI's jsonable_encoder pass.
+"""
+import json
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from metrics import record
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, "item"):  # numpy scalar
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content):
+    """Serialize `content` to JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content):
+        start = time.perf_counter()
+        body = dumps(content)
+        record("serialize_seconds", time.perf_counter() - start)
+        return body
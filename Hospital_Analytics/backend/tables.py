@@ -0,0 +1,115 @@
+"""
+Declarative schemas of the nine tables loaded by the ETL: column types,
+primary keys and the secondary indexes built once the data is in (foreign
+keys are indexed, not declared, so tables reload independently).
+"""
+from sqlalchemy import Column, DateTime, Float, Index, Integer, MetaData, String, Table
+
+metadata = MetaData()
+
+branches = Table(
+    "branches", metadata,
+    Column("branch_id", Integer, primary_key=True, autoincrement=False),
+    Column("branch_name", String(100)),
+    Column("city", String(50)),
+    Column("total_beds", Integer),
+)
+
+departments = Table(
+    "departments", metadata,
+    Column("department_id", Integer, primary_key=True, autoincrement=False),
+    Column("department_name", String(50)),
+    Column("branch_id", Integer),
+    Column("total_beds", Integer),
+    Index("ix_departments_branch_id", "branch_id"),
+)
+
+doctors = Table(
+    "doctors", metadata,
+    Column("doctor_id", Integer, primary_key=True, autoincrement=False),
+    Column("doctor_name", String(100)),
+    Column("department_id", Integer),
+    Column("department_name", String(50)),
+    Column("available_hours", Integer),
+    Column("booked_hours", Integer),
+    Index("ix_doctors_department_id", "department_id"),
+)
+
+patients = Table(
+    "patients", metadata,
+    Column("patient_id", Integer, primary_key=True, autoincrement=False),
+    Column("patient_name", String(100)),
+    Column("age", Integer),
+    Column("gender", String(10)),
+    Column("insurance_type", String(30)),
+)
+
+admissions = Table(
+    "admissions", metadata,
+    Column("admission_id", Integer, primary_key=True, autoincrement=False),
+    Column("patient_id", Integer),
+    Column("department_id", Integer),
+    Column("department_name", String(50)),
+    Column("branch_id", Integer),
+    Column("doctor_id", Integer),
+    Column("admission_datetime", DateTime),
+    Column("discharge_datetime", DateTime),
+    Column("admission_type", String(20)),
+    Column("length_of_stay", Integer),
+    Column("is_readmission", Integer),
+    # Also serves each patient's admission history (readmission lookups)
+    Index("ix_admissions_patient_id", "patient_id", "admission_datetime"),
+    Index("ix_admissions_department_id", "department_id"),
+    Index("ix_admissions_doctor_id", "doctor_id"),
+    Index("ix_admissions_branch_id", "branch_id"),
+    Index("ix_admissions_type_datetime", "admission_type", "admission_datetime"),
+)
+
+procedures = Table(
+    "procedures", metadata,
+    Column("procedure_id", Integer, primary_key=True, autoincrement=False),
+    Column("admission_id", Integer),
+    Column("doctor_id", Integer),
+    Column("procedure_type", String(50)),
+    Column("procedure_datetime", DateTime),
+    Column("duration_minutes", Integer),
+    Index("ix_procedures_admission_id", "admission_id"),
+    Index("ix_procedures_doctor_id", "doctor_id"),
+)
+
+billing = Table(
+    "billing", metadata,
+    Column("admission_id", Integer, primary_key=True, autoincrement=False),
+    Column("room_cost", Integer),
+    Column("procedure_cost", Integer),
+    Column("medicine_cost", Integer),
+    Column("diagnostic_cost", Integer),
+    Column("total_cost", Integer),
+    Column("insurance_covered", Float),
+    Column("patient_paid", Float),
+)
+
+outcomes = Table(
+    "outcomes", metadata,
+    Column("admission_id", Integer, primary_key=True, autoincrement=False),
+    Column("outcome", String(30)),
+)
+
+bed_occupancy = Table(
+    "bed_occupancy", metadata,
+    Column("snapshot_id", Integer, primary_key=True, autoincrement=False),
+    Column("department_id", Integer),
+    Column("department_name", String(50)),
+    Column("branch_id", Integer),
+    Column("snapshot_datetime", DateTime),
+    Column("occupied_beds", Integer),
+    Column("total_beds", Integer),
+    Column("occupancy_rate", Float),
+    # /kpis/bed-alerts filters and orders on these, /kpis/trends/occupancy on the datetime ones
+    Index("ix_bed_occupancy_rate_datetime", "occupancy_rate", "snapshot_datetime"),
+    Index("ix_bed_occupancy_datetime", "snapshot_datetime"),
+    Index("ix_bed_occupancy_branch_datetime", "branch_id", "snapshot_datetime"),
+    Index("ix_bed_occupancy_department_datetime", "department_id", "snapshot_datetime"),
+)
+
+TABLE_SCHEMAS = {table.name: table for table in metadata.sorted_tables}
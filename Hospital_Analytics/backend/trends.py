@@ -0,0 +1,119 @@
+"""
+Time-bucketed KPI trends (emergency load from kpi_admissions_hourly,
+occupancy from bed_occupancy) per hour, day, week (from Monday) or month,
+with date range and branch/department filters served by indexes.
+"""
+from datetime import datetime, timedelta
+
+from kpis import fetch_records
+
+TREND_BUCKETS = ["hour", "day", "week", "month"]
+
+# How SQLAlchemy stores DATETIME values in SQLite (as text); bucket starts
+# use the same layout so they compare and sort like the stored timestamps
+SQLITE_DATETIME = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def bucket_start(dialect, bucket, col):
+    """SQL expression truncating timestamp `col` to the start of its bucket."""
+    if bucket not in TREND_BUCKETS:
+        raise ValueError(f"Unknown bucket {bucket!r}, expected one of {TREND_BUCKETS}")
+    if dialect == "mssql":
+        return {
+            "hour": f"DATEADD(HOUR, DATEDIFF(HOUR, 0, {col}), 0)",
+            "day": f"CAST(CAST({col} AS DATE) AS DATETIME)",
+            # Day 0 (1900-01-01) was a Monday
+            "week": f"DATEADD(DAY, -(DATEDIFF(DAY, 0, {col}) % 7), CAST(CAST({col} AS DATE) AS DATETIME))",
+            "month": f"CAST(DATEFROMPARTS(YEAR({col}), MONTH({col}), 1) AS DATETIME)",
+        }[bucket]
+    if dialect == "sqlite":
+        # Whole seconds only: SQLite rounds to milliseconds, which would move
+        # 23:59:59.9999 into the next day
+        col = f"substr({col}, 1, 19)"
+        return {
+            "hour": f"strftime('%Y-%m-%d %H:00:00.000000', {col})",
+            "day": f"strftime('%Y-%m-%d 00:00:00.000000', {col})",
+            # Forward to Sunday (unless it is one), then back to that week's Monday
+            "week": f"strftime('%Y-%m-%d 00:00:00.000000', {col}, 'weekday 0', '-6 days')",
+            "month": f"strftime('%Y-%m-01 00:00:00.000000', {col})",
+        }[bucket]
+    raise ValueError(f"Unsupported SQL dialect for trends: {dialect}")
+
+
+def _filters(col, branch_id, department_id, start_date, end_date):
+    """WHERE clause and parameters for the optional filters (end_date is inclusive)."""
+    clauses = []
+    params = {}
+    if branch_id is not None:
+        clauses.append("branch_id = :branch_id")
+        params["branch_id"] = branch_id
+    if department_id is not None:
+        clauses.append("department_id = :department_id")
+        params["department_id"] = department_id
+    if start_date is not None:
+        clauses.append(f"{col} >= :start")
+        params["start"] = datetime.combine(start_date, datetime.min.time())
+    if end_date is not None:
+        clauses.append(f"{col} < :end")
+        params["end"] = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+    return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def admission_trend_query(dialect, bucket, **filters):
+    bucket_expr = bucket_start(dialect, bucket, "bucket_start")
+    where, params = _filters("bucket_start", **filters)
+    return f"""
+    SELECT
+        {bucket_expr} AS bucket_start,
+        SUM(admissions) AS admissions,
+        SUM(emergency_admissions) AS emergency_admissions,
+        SUM(emergency_admissions) * 100.0 / SUM(admissions) AS emergency_pct,
+        SUM(readmissions) AS readmissions
+    FROM kpi_admissions_hourly
+    {where}
+    GROUP BY {bucket_expr}
+    ORDER BY 1
+    """, params
+
+
+def occupancy_trend_query(dialect, bucket, **filters):
+    bucket_expr = bucket_start(dialect, bucket, "snapshot_datetime")
+    where, params = _filters("snapshot_datetime", **filters)
+    return f"""
+    SELECT
+        {bucket_expr} AS bucket_start,
+        COUNT(*) AS snapshots,
+        SUM(occupied_beds) * 100.0 / NULLIF(SUM(total_beds), 0) AS occupancy_rate,
+        MAX(occupancy_rate) AS max_occupancy_rate
+    FROM bed_occupancy
+    {where}
+    GROUP BY {bucket_expr}
+    ORDER BY 1
+    """, params
+
+
+TREND_QUERIES = {
+    "emergency-load": admission_trend_query,
+    "occupancy": occupancy_trend_query,
+}
+
+
+def _sql_param(dialect, value):
+    # SQLite holds DATETIME as text; compare against the same layout
+    if dialect == "sqlite" and isinstance(value, datetime):
+        return value.strftime(SQLITE_DATETIME)
+    return value
+
+
+def fetch_trend(engine, trend, bucket="day", branch_id=None, department_id=None, start_date=None, end_date=None):
+    """Rows of one trend, oldest bucket first, with bucket_start as a datetime."""
+    dialect = engine.dialect.name
+    query, params = TREND_QUERIES[trend](
+        dialect, bucket,
+        branch_id=branch_id, department_id=department_id, start_date=start_date, end_date=end_date,
+    )
+    rows = fetch_records(engine, query, {k: _sql_param(dialect, v) for k, v in params.items()})
+    for row in rows:
+        if isinstance(row["bucket_start"], str):
+            row["bucket_start"] = datetime.strptime(row["bucket_start"], SQLITE_DATETIME)
+    return rows
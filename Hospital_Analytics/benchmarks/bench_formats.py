@@ -0,0 +1,138 @@
+"""
+CSV vs Parquet benchmark: write time, file size, typed read, column scan
+and bulk ETL load, optionally on tables replicated `--scale` times.
+
+    python bench_formats.py --data ../data/csv_data --scale 20 --out formats.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from etl import DATETIME_COLUMNS, TABLES, apply_schema, read_table_csv, read_table_parquet, run_load  # noqa: E402
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, round(time.perf_counter() - start, 4)
+
+
+def replicate(table, df, scale, id_spans):
+    """
+    `df` repeated `scale` times. Copy k adds k * span to every *_id column,
+    where a column's span is the largest id of the table that owns it
+    (recorded in `id_spans` by the first table that has the column).
+    """
+    id_columns = [c for c in df.columns if c.endswith("_id")]
+    for column in id_columns:
+        id_spans.setdefault(column, int(df[column].max()))
+    copies = []
+    for k in range(scale):
+        copy = df.copy()
+        for column in id_columns:
+            copy[column] = copy[column].astype("int64") + k * id_spans[column]
+        copies.append(copy)
+    return apply_schema(table, pd.concat(copies, ignore_index=True))
+
+
+def scan_columns(table, df):
+    """Key column plus the first datetime column (or the second column)."""
+    columns = [df.columns[0]]
+    columns.append((DATETIME_COLUMNS[table] or [df.columns[1]])[0])
+    return columns
+
+
+def bench_table(table, df, workdir):
+    csv_path = os.path.join(workdir, f"{table}.csv")
+    parquet_path = os.path.join(workdir, f"{table}.parquet")
+    columns = scan_columns(table, df)
+
+    _, csv_write = _timed(df.to_csv, csv_path, index=False)
+    _, parquet_write = _timed(df.to_parquet, parquet_path, index=False)
+    _, csv_read = _timed(read_table_csv, table, csv_path)
+    _, parquet_read = _timed(read_table_parquet, parquet_path)
+    _, csv_scan = _timed(pd.read_csv, csv_path, usecols=columns)
+    _, parquet_scan = _timed(read_table_parquet, parquet_path, columns=columns)
+
+    return {
+        "rows": len(df),
+        "scan_columns": columns,
+        "csv": {
+            "bytes": os.path.getsize(csv_path),
+            "write_seconds": csv_write,
+            "read_seconds": csv_read,
+            "scan_seconds": csv_scan,
+        },
+        "parquet": {
+            "bytes": os.path.getsize(parquet_path),
+            "write_seconds": parquet_write,
+            "read_seconds": parquet_read,
+            "scan_seconds": parquet_scan,
+        },
+    }
+
+
+def bench_load(workdir, file_format):
+    # File-backed: an in-memory SQLite database is private to one thread
+    engine = create_engine(f"sqlite:///{os.path.join(workdir, f'load_{file_format}.db')}")
+    report, seconds = _timed(run_load, engine, workdir, mode="bulk", file_format=file_format, build_aggregates=False)
+    engine.dispose()
+    return {
+        "wall_seconds": seconds,
+        "tables": {t: r["rows_per_sec"] for t, r in report.items() if isinstance(r, dict) and "rows_per_sec" in r},
+        "failed": [
+            t for t, r in report.items()
+            if not isinstance(r, dict) or r.get("status") in ("error", "skipped")
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--data", default=os.path.join(os.path.dirname(__file__), "..", "data", "csv_data"))
+    parser.add_argument("--scale", type=int, default=1, help="replicate every table this many times")
+    parser.add_argument("--out", help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    results = {"scale": args.scale, "tables": {}}
+    id_spans = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for table in TABLES:
+            source = os.path.join(args.data, f"{table}.csv")
+            if not os.path.exists(source):
+                continue
+            df = read_table_csv(table, source)
+            if args.scale > 1:
+                df = replicate(table, df, args.scale, id_spans)
+            results["tables"][table] = bench_table(table, df, workdir)
+            print(f"{table:>14}: {len(df)} rows", file=sys.stderr)
+
+        results["load"] = {fmt: bench_load(workdir, fmt) for fmt in ("csv", "parquet")}
+
+    totals = {
+        fmt: {
+            key: round(sum(t[fmt][key] for t in results["tables"].values()), 4)
+            for key in ("bytes", "write_seconds", "read_seconds", "scan_seconds")
+        }
+        for fmt in ("csv", "parquet")
+    }
+    results["totals"] = totals
+
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
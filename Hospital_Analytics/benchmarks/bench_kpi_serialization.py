@@ -0,0 +1,91 @@
+"""
+KPI response path benchmark: pandas round-trip (read_sql, to_dict,
+jsonable_encoder) vs fetch_records and FastJSONResponse, per endpoint.
+
+    python bench_kpi_serialization.py --data ../data/csv_data --repeat 200 --out serialization.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine
+from starlette.responses import JSONResponse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from etl import run_load  # noqa: E402
+from kpis import KPI_QUERIES, fetch_records  # noqa: E402
+from responses import FastJSONResponse  # noqa: E402
+
+BENCH_QUERIES = dict(KPI_QUERIES, **{
+    "bed-occupancy": """
+    SELECT department_name, branch_id, snapshot_datetime, occupancy_rate
+    FROM bed_occupancy
+    ORDER BY occupancy_rate DESC
+    """,
+})
+
+
+def pandas_path(engine, query):
+    records = pd.read_sql(query, engine).to_dict(orient="records")
+    return JSONResponse(jsonable_encoder(records)).body
+
+
+def fast_path(engine, query):
+    return FastJSONResponse(fetch_records(engine, query)).body
+
+
+def time_path(fn, engine, query, repeat):
+    fn(engine, query)  # warm up connection and statement cache
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(engine, query)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--data", default=os.path.join(os.path.dirname(__file__), "..", "data", "csv_data"))
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--out", help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    results = {"repeat": args.repeat, "endpoints": {}}
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'kpis.db')}")
+        run_load(engine, args.data, mode="bulk")
+
+        for name, query in BENCH_QUERIES.items():
+            pandas_stats = time_path(pandas_path, engine, query, args.repeat)
+            fast_stats = time_path(fast_path, engine, query, args.repeat)
+            results["endpoints"][name] = {
+                "rows": len(fetch_records(engine, query)),
+                "pandas": pandas_stats,
+                "fast": fast_stats,
+                "speedup": round(pandas_stats["median_ms"] / fast_stats["median_ms"], 2),
+            }
+            print(f"{name:>18}: {results['endpoints'][name]['speedup']}x", file=sys.stderr)
+        engine.dispose()
+
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+End-to-end benchmark: generation, ETL load and KPI endpoint latency per
+data scale, run offline and written as JSON so runs can be diffed.
+
+    python bench_suite.py --scales 3000 100000 --out suite.json
+    python bench_suite.py --scales 3000 100000 1000000 10000000 --skip-kpis
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import httpx
+from sqlalchemy import create_engine
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(HERE, "..", "data")
+BACKEND_DIR = os.path.join(HERE, "..", "backend")
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, DATA_DIR)
+
+from etl import run_load  # noqa: E402
+from generate_data import generate, write_tables  # noqa: E402
+
+DEFAULT_SCALES = [3_000, 100_000, 1_000_000, 10_000_000]
+
+KPI_ENDPOINTS = [
+    "/kpis/summary",
+    "/kpis/bed-alerts",
+    "/kpis/emergency-load",
+    "/kpis/doctor-utilization",
+]
+
+
+def percentile(sorted_samples, pct):
+    index = min(len(sorted_samples) - 1, max(0, round(pct / 100 * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+
+def bench_generate(num_admissions, data_folder, trace_memory=True):
+    """Generate `num_admissions` admissions (and as many patients) into data_folder."""
+    start = time.perf_counter()
+    tables, stages = generate(
+        num_patients=num_admissions, num_admissions=num_admissions,
+        trace_memory=trace_memory, verbose=False,
+    )
+    stages["export"] = {"seconds": round(write_tables(tables, data_folder), 3)}
+    return {
+        "total_seconds": round(time.perf_counter() - start, 3),
+        "stages": stages,
+        "slowest_stage": max(stages, key=lambda s: stages[s]["seconds"]),
+    }
+
+
+def bench_etl(engine, data_folder, workers):
+    start = time.perf_counter()
+    report = run_load(engine, data_folder, mode="bulk", workers=workers)
+    wall = time.perf_counter() - start
+
+    tables = {t: r for t, r in report.items() if isinstance(r, dict)}
+    return {
+        "wall_seconds": round(wall, 3),
+        "rows": sum(r.get("rows", 0) for t, r in tables.items() if not t.startswith("kpi_")),
+        "tables": {
+            t: {k: r[k] for k in ("status", "rows", "rows_per_sec", "insert_seconds", "index_seconds") if k in r}
+            for t, r in tables.items()
+        },
+    }
+
+
+def kpi_app(engine, data_folder, cached):
+    """
+    The backend app serving from `engine`. Importing main.py opens no
+    database (see database.py), so the app is simply handed the benchmark
+    engine; data_folder is where its ETL endpoint would load from.
+    """
+    import main
+
+    main.CSV_FOLDER = data_folder
+    main.engines.swap(engine)
+    main.kpi_cache.clear()
+    # A zero TTL makes every lookup a miss, so each request runs its query
+    main.kpi_cache.ttl = main.KPI_CACHE_TTL_SECONDS if cached else 0
+    return main.app
+
+
+async def _hammer(app, path, requests, concurrency):
+    samples = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(path)
+                samples.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        wall = time.perf_counter() - start
+
+    samples.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / wall, 1),
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p90_ms": round(percentile(samples, 90), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+def bench_kpis(app, requests, concurrency):
+    return {
+        path: asyncio.run(_hammer(app, path, requests, concurrency))
+        for path in KPI_ENDPOINTS
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES,
+                        help="admission counts to benchmark")
+    # The benchmark loads into SQLite, which takes one writer at a time
+    parser.add_argument("--workers", type=int, default=1, help="ETL loader threads")
+    parser.add_argument("--requests", type=int, default=200, help="requests per KPI endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--cached", action="store_true", help="keep the KPI result cache enabled")
+    parser.add_argument("--skip-kpis", action="store_true")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc peak tracking (faster)")
+    parser.add_argument("--out", help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    results = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "scales": {},
+    }
+
+    for scale in args.scales:
+        print(f"scale {scale}: generating", file=sys.stderr)
+        with tempfile.TemporaryDirectory() as workdir:
+            data_folder = os.path.join(workdir, "csv_data")
+            entry = {"generate": bench_generate(scale, data_folder, not args.no_memory)}
+
+            print(f"scale {scale}: loading", file=sys.stderr)
+            engine = create_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+            entry["etl"] = bench_etl(engine, data_folder, args.workers)
+
+            if not args.skip_kpis:
+                print(f"scale {scale}: querying", file=sys.stderr)
+                app = kpi_app(engine, data_folder, args.cached)
+                entry["kpis"] = bench_kpis(app, args.requests, args.concurrency)
+            engine.dispose()
+
+        results["scales"][str(scale)] = entry
+
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+Vectorized admissions engine: draws a whole day of admissions at a time
+with NumPy and yields them in time order as fixed-size chunks, so output
+depends only on the seed, never on the chunk size.
+"""
+import numpy as np
+import pandas as pd
+
+from readmissions import READMISSION_WINDOW_DAYS, flag_readmissions, last_discharge_by_patient
+
+DEFAULT_CHUNK_SIZE = 500_000
+
+# Share of admissions that revisit an already admitted patient
+READMISSION_SHARE = 0.10
+# Revisits only start once this many patients have been admitted
+MIN_USED_PATIENTS = 100
+
+EMERGENCY_HOUR_WEIGHTS = [3, 2, 2, 2, 3, 4, 5, 6, 7, 8, 7, 6, 5, 4, 4, 5, 6, 7, 8, 9, 8, 7, 6, 5]
+WINTER_MONTHS = [12, 1]
+WINTER_DEPARTMENTS = ["Emergency", "General Medicine"]
+
+ADMISSION_COLUMNS = [
+    "admission_id", "patient_id", "department_id", "department_name",
+    "branch_id", "doctor_id", "admission_datetime",
+    "discharge_datetime", "admission_type", "length_of_stay", "is_readmission"
+]
+
+NS_PER_SECOND = 1_000_000_000
+NS_PER_HOUR = 3600 * NS_PER_SECOND
+NS_PER_DAY = 24 * NS_PER_HOUR
+
+
+def _day_grid(start_date, end_date):
+    """
+    Calendar days covered by [start_date, end_date) and the probability of a
+    uniformly drawn timestamp falling on each of them.
+    """
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date)
+    first = start.normalize()
+    n_days = int(np.ceil((end - first) / pd.Timedelta(days=1)))
+    day_starts = first + pd.to_timedelta(np.arange(n_days), unit="D")
+
+    overlap = (
+        np.minimum(day_starts + pd.Timedelta(days=1), end)
+        - np.maximum(day_starts, start)
+    ) / pd.Timedelta(seconds=1)
+    overlap = np.clip(np.asarray(overlap, dtype=float), 0, None)
+    return day_starts, overlap / overlap.sum()
+
+
+def _doctor_index(doctors_df):
+    """Doctor ids grouped by department_id, with per-department offsets and counts."""
+    doctors = doctors_df.sort_values(["department_id", "doctor_id"], kind="stable")
+    dept_ids = doctors["department_id"].to_numpy()
+    size = int(dept_ids.max()) + 1
+    counts = np.bincount(dept_ids, minlength=size)
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    return doctors["doctor_id"].to_numpy(), offsets, counts
+
+
+def generate_admissions(patients_df, departments_df, doctors_df, num_admissions,
+                        start_date, end_date, departments, branches, los_rules,
+                        seed=42, chunk_size=DEFAULT_CHUNK_SIZE,
+                        readmission_window_days=READMISSION_WINDOW_DAYS, first_admission_id=1):
+    """
+    Yield admissions as DataFrames of at most `chunk_size` rows, numbered from
+    `first_admission_id`, with readmissions flagged across chunks.
+    """
+    rng = np.random.default_rng(seed)
+
+    patient_ids = patients_df["patient_id"].to_numpy()
+    ages = patients_df["age"].to_numpy()
+    n_patients = len(patient_ids)
+
+    dept_names = np.asarray(departments, dtype=object)
+    n_depts = len(departments)
+    pediatrics = departments.index("Pediatrics")
+    cardiology = departments.index("Cardiology")
+    oncology = departments.index("Oncology")
+    emergency = departments.index("Emergency")
+    winter_depts = np.isin(dept_names, WINTER_DEPARTMENTS)
+    los_low = np.array([los_rules[d][0] for d in departments])
+    los_high = np.array([los_rules[d][1] for d in departments])
+
+    branch_weights = np.array([b["beds"] for b in branches], dtype=float)
+    branch_weights /= branch_weights.sum()
+
+    # department_id for every (department, branch) pair
+    dept_lookup = np.zeros((n_depts, len(branches)), dtype=np.int64)
+    for row in departments_df.itertuples(index=False):
+        dept_lookup[departments.index(row.department_name), row.branch_id - 1] = row.department_id
+
+    doctor_ids, doctor_offsets, doctor_counts = _doctor_index(doctors_df)
+
+    hour_weights = np.array(EMERGENCY_HOUR_WEIGHTS, dtype=float)
+    hour_weights /= hour_weights.sum()
+
+    day_starts, day_probs = _day_grid(start_date, end_date)
+    day_start_ns = day_starts.as_unit("ns").asi8
+    day_is_weekend = day_starts.dayofweek.to_numpy() >= 5
+    day_is_winter = np.isin(day_starts.month.to_numpy(), WINTER_MONTHS)
+    day_counts = rng.multinomial(num_admissions, day_probs)
+
+    # Patients admitted so far (unique) and the length of the original
+    # `used_patients` list, which counts repeats
+    seen = np.zeros(n_patients, dtype=bool)
+    seen_positions = np.empty(0, dtype=np.int64)
+    used_len = 0
+
+    last_discharge = None
+    next_id = first_admission_id
+    buffer = []
+    buffered = 0
+
+    for day, m in enumerate(day_counts):
+        if m == 0:
+            continue
+
+        # ---- Patients: revisit an earlier patient or draw from everyone
+        idx = np.arange(m)
+        revisit = (rng.random(m) < READMISSION_SHARE) & (idx >= MIN_USED_PATIENTS + 1 - used_len)
+        new_draws = rng.integers(0, n_patients, m)
+        fresh = new_draws[~revisit]
+        fresh_before = np.cumsum(~revisit) - (~revisit)
+        pick = (rng.random(m) * (len(seen_positions) + fresh_before)).astype(np.int64)
+        from_seen = pick < len(seen_positions)
+        position = new_draws.copy()
+        position[revisit & from_seen] = seen_positions[pick[revisit & from_seen]]
+        from_day = revisit & ~from_seen
+        position[from_day] = fresh[pick[from_day] - len(seen_positions)]
+
+        used_len += len(fresh)
+        unseen = np.unique(fresh[~seen[fresh]])
+        seen[unseen] = True
+        seen_positions = np.concatenate([seen_positions, unseen])
+
+        age = ages[position]
+
+        # ---- Age-based department selection
+        dept = np.select(
+            [
+                age < 15,
+                (age > 60) & (rng.random(m) < 0.35),
+                (age > 50) & (rng.random(m) < 0.20),
+            ],
+            [
+                pediatrics,
+                np.where(rng.random(m) < 0.60, cardiology, oncology),
+                cardiology,
+            ],
+            default=rng.integers(0, n_depts, m),
+        )
+
+        branch = rng.choice(len(branches), m, p=branch_weights)
+
+        # ---- Emergency probability and time-of-day patterns
+        if day_is_weekend[day]:
+            emergency_prob = np.where(dept == emergency, 0.90, 0.45)
+        else:
+            emergency_prob = np.where(dept == emergency, 0.90, 0.30)
+        is_emergency = rng.random(m) < emergency_prob
+
+        hour = np.where(
+            is_emergency,
+            rng.choice(24, m, p=hour_weights),
+            rng.integers(8, 17, m),
+        )
+        seconds = hour * 3600 + rng.integers(0, 60, m) * 60 + rng.integers(0, 60, m)
+        admit = day_start_ns[day] + seconds * NS_PER_SECOND
+
+        # ---- Department-specific LOS with winter flu variation
+        los = rng.integers(los_low[dept], los_high[dept] + 1)
+        if day_is_winter[day]:
+            los = los + np.where(winter_depts[dept], rng.integers(0, 3, m), 0)
+        discharge = admit + los * NS_PER_DAY + rng.integers(8, 17, m) * NS_PER_HOUR
+
+        dept_id = dept_lookup[dept, branch]
+        doctor = doctor_ids[
+            doctor_offsets[dept_id]
+            + (rng.random(m) * doctor_counts[dept_id]).astype(np.int64)
+        ]
+
+        order = np.argsort(admit, kind="stable")
+        buffer.append({
+            "patient_id": patient_ids[position][order],
+            "department_id": dept_id[order],
+            "department_name": dept_names[dept][order],
+            "branch_id": branch[order] + 1,
+            "doctor_id": doctor[order],
+            "admission_datetime": admit[order],
+            "discharge_datetime": discharge[order],
+            "admission_type": np.where(is_emergency, "Emergency", "Scheduled")[order],
+            "length_of_stay": los[order],
+        })
+        buffered += m
+
+        while buffered >= chunk_size:
+            chunk, buffer, buffered = _take(buffer, chunk_size)
+            df = _to_frame(chunk, next_id)
+            df["is_readmission"] = flag_readmissions(df, readmission_window_days, last_discharge)
+            last_discharge = last_discharge_by_patient(df, last_discharge)
+            next_id += chunk_size
+            yield df
+
+    if buffered:
+        chunk, buffer, buffered = _take(buffer, buffered)
+        df = _to_frame(chunk, next_id)
+        df["is_readmission"] = flag_readmissions(df, readmission_window_days, last_discharge)
+        yield df
+
+
+def _take(buffer, n):
+    """Split the first n buffered rows off the buffer."""
+    merged = {col: np.concatenate([part[col] for part in buffer]) for col in buffer[0]}
+    head = {col: values[:n] for col, values in merged.items()}
+    rest = len(merged["patient_id"]) - n
+    if rest:
+        return head, [{col: values[n:] for col, values in merged.items()}], rest
+    return head, [], 0
+
+
+def _to_frame(chunk, first_id):
+    n = len(chunk["patient_id"])
+    df = pd.DataFrame({"admission_id": np.arange(first_id, first_id + n), **chunk})
+    df["admission_datetime"] = pd.to_datetime(df["admission_datetime"])
+    df["discharge_datetime"] = pd.to_datetime(df["discharge_datetime"])
+    df["is_readmission"] = 0
+    return df[ADMISSION_COLUMNS]
+
+
+class ChunkWriter:
+    """
+    Appends DataFrame chunks to one CSV or Parquet file (one row group per
+    chunk), so a table never has to be held in memory whole. Use as a
+    context manager; `rows` counts the rows written.
+    """
+
+    def __init__(self, path, output_format="csv", compression="snappy"):
+        self.path = path
+        self.output_format = output_format
+        self.compression = compression
+        self.rows = 0
+        self._parquet = None
+
+    def write(self, chunk):
+        if self.output_format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._parquet is None:
+                batch = pa.Table.from_pandas(chunk, preserve_index=False)
+                self._parquet = pq.ParquetWriter(self.path, batch.schema, compression=self.compression)
+            else:
+                # Categories differ between chunks; the file keeps the first chunk's schema
+                batch = pa.Table.from_pandas(chunk, schema=self._parquet.schema, preserve_index=False)
+            self._parquet.write_table(batch)
+        else:
+            chunk.to_csv(self.path, mode="w" if self.rows == 0 else "a", header=(self.rows == 0), index=False)
+        self.rows += len(chunk)
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+            self._parquet = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_admissions_csv(chunks, path):
+    """Stream admission chunks into a single CSV file. Returns the row count."""
+    with ChunkWriter(path, "csv") as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    return writer.rows
+
+
+def write_admissions_parquet(chunks, path, compression="snappy"):
+    """Stream admission chunks into a single Parquet file, one row group per chunk."""
+    with ChunkWriter(path, "parquet", compression) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    return writer.rows
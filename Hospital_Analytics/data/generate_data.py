@@ -1,19 +1,32 @@
-import pandas as pd
-import numpy as np
-from faker import Faker
-import random
-from datetime import datetime, timedelta
+"""
+Hospital analytics data generator: one stage function per table, run by
+generate() with per-stage time, memory and row metrics, and written as CSV
+or Parquet; --shards splits the work over processes, --stream writes
+admissions chunk by chunk.
+
+    python generate_data.py
+    python generate_data.py --admissions 1000000 --patients 1000000 --metrics metrics.json
+    python generate_data.py --admissions 10000000 --patients 5000000 --shards 16
+"""
+import argparse
+import contextlib
+import cProfile
+import glob
+import json
 import os
-# ========================================
-# INITIAL SETUP
-# ========================================
-fake = Faker("en_IN")
-random.seed(42)
-np.random.seed(42)
+import random
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 
-print("=" * 70)
-print("HOSPITAL ANALYTICS DATA GENERATOR - SQL Server")
-print("=" * 70)
+import numpy as np
+import pandas as pd
+
+from admissions_engine import ChunkWriter, generate_admissions
+from name_pool import draw_names, load_name_pool
+from occupancy import build_bed_occupancy, compute_bed_occupancy, occupancy_counts, snapshot_times
+from schema import apply_schema
 
 START_DATE = datetime(2025, 8, 1)
 END_DATE = datetime(2026, 1, 31)
@@ -21,6 +34,25 @@ END_DATE = datetime(2026, 1, 31)
 NUM_PATIENTS = 3000
 NUM_ADMISSIONS = 3000
 
+SEED = 42
+
+# Admissions starting within this many days of the patient's previous
+# discharge are flagged as readmissions
+READMISSION_WINDOW_DAYS = 30
+
+# Admissions are generated in whole-array batches and handed over in chunks
+# of this many rows; --stream writes them (and their procedures, billing and
+# outcomes) to disk one chunk at a time
+ADMISSION_CHUNK_SIZE = 500_000
+
+# "csv" or "parquet" (typed, compressed columns; needs pyarrow)
+OUTPUT_FORMAT = "csv"
+PARQUET_COMPRESSION = "snappy"
+OUTPUT_DIR = "csv_data"
+
+# Bed census interval: "hourly", "8-hourly", "daily" or any Timedelta string
+SNAPSHOT_FREQUENCY = "daily"
+
 DEPARTMENTS = [
     "Cardiology", "Oncology", "Orthopedics",
     "Pediatrics", "Emergency", "General Medicine"
@@ -33,6 +65,8 @@ BRANCHES = [
 ]
 
 INSURANCE_TYPES = ["Government", "Private", "Self-Pay"]
+INSURANCE_WEIGHTS = [40, 45, 15]
+GENDERS = ["Male", "Female"]
 OUTCOMES = ["Recovered", "Improved", "Transferred", "Deceased"]
 
 LOS_RULES = {
@@ -62,24 +96,13 @@ PROCEDURE_TYPES = {
     "General Medicine": ["Diagnostic Tests", "IV Therapy", "General Treatment"]
 }
 
-# ========================================
-# 1. BRANCHES
-# ========================================
-print("\n[1/9] Generating Branches...")
-branches_df = pd.DataFrame(
-    [[i + 1, b["name"], b["city"], b["beds"]] for i, b in enumerate(BRANCHES)],
-    columns=["branch_id", "branch_name", "city", "total_beds"]
-)
-print(f" {len(branches_df)} branches")
-
-# ========================================
-# 2. DEPARTMENTS
-# ========================================
-print("\n[2/9] Generating Departments...")
-departments_data = []
-dept_id = 1
+# Procedures per admission (inclusive range); other departments get 1-2
+PROCEDURE_COUNTS = {
+    "Oncology": (2, 5),
+    "Cardiology": (1, 3),
+}
 
-allocation = {
+BED_ALLOCATION = {
     "Emergency": 0.25,
     "General Medicine": 0.25,
     "Cardiology": 0.15,
@@ -88,392 +111,690 @@ allocation = {
     "Oncology": 0.08
 }
 
-for branch_id, b in enumerate(BRANCHES, 1):
-    for dept in DEPARTMENTS:
-        departments_data.append([
-            dept_id, dept, branch_id, int(b["beds"] * allocation[dept])
-        ])
-        dept_id += 1
+AGE_GROUPS = ["child", "young", "adult", "senior", "elderly"]
+AGE_GROUP_WEIGHTS = [10, 20, 30, 28, 12]
+AGE_RANGES = {
+    "child": (0, 14),
+    "young": (15, 35),
+    "adult": (36, 55),
+    "senior": (56, 75),
+    "elderly": (76, 95)
+}
+
+
+# ========================================
+# 1. BRANCHES
+# ========================================
+def generate_branches():
+    return apply_schema("branches", pd.DataFrame(
+        [[i + 1, b["name"], b["city"], b["beds"]] for i, b in enumerate(BRANCHES)],
+        columns=["branch_id", "branch_name", "city", "total_beds"]
+    ))
+
+
+# ========================================
+# 2. DEPARTMENTS
+# ========================================
+def generate_departments():
+    departments_data = []
+    dept_id = 1
+
+    for branch_id, b in enumerate(BRANCHES, 1):
+        for dept in DEPARTMENTS:
+            departments_data.append([
+                dept_id, dept, branch_id, int(b["beds"] * BED_ALLOCATION[dept])
+            ])
+            dept_id += 1
+
+    return apply_schema("departments", pd.DataFrame(
+        departments_data,
+        columns=["department_id", "department_name", "branch_id", "total_beds"]
+    ))
 
-departments_df = pd.DataFrame(
-    departments_data,
-    columns=["department_id", "department_name", "branch_id", "total_beds"]
-)
-print(f" {len(departments_df)} departments")
 
 # ========================================
 # 3. DOCTORS
 # ========================================
-print("\n[3/9] Generating Doctors...")
-doctors_data = []
-doctor_id = 1
-
-for _, dept in departments_df.iterrows():
-    for _ in range(random.randint(3, 5)):
-        available = 160
-
-        # Department-specific utilization
-        if dept["department_name"] in ["Emergency", "General Medicine"]:
-            utilization = random.uniform(0.75, 0.95)
-        elif dept["department_name"] == "Oncology":
-            utilization = random.uniform(0.65, 0.85)
-        else:
-            utilization = random.uniform(0.60, 0.80)
-
-        doctors_data.append([
-            doctor_id,
-            fake.name(),
-            dept["department_id"],
-            dept["department_name"],
-            available,
-            int(available * utilization)
-        ])
-        doctor_id += 1
-
-doctors_df = pd.DataFrame(
-    doctors_data,
-    columns=["doctor_id", "doctor_name", "department_id",
-             "department_name", "available_hours", "booked_hours"]
-)
-print(f"  {len(doctors_df)} doctors")
+def generate_doctors(departments_df, names):
+    doctors_data = []
+    doctor_id = 1
+
+    for _, dept in departments_df.iterrows():
+        for _ in range(random.randint(3, 5)):
+            available = 160
+
+            # Department-specific utilization
+            if dept["department_name"] in ["Emergency", "General Medicine"]:
+                utilization = random.uniform(0.75, 0.95)
+            elif dept["department_name"] == "Oncology":
+                utilization = random.uniform(0.65, 0.85)
+            else:
+                utilization = random.uniform(0.60, 0.80)
+
+            doctors_data.append([
+                doctor_id,
+                dept["department_id"],
+                dept["department_name"],
+                available,
+                int(available * utilization)
+            ])
+            doctor_id += 1
+
+    doctors_df = pd.DataFrame(
+        doctors_data,
+        columns=["doctor_id", "department_id", "department_name",
+                 "available_hours", "booked_hours"]
+    )
+    doctors_df.insert(1, "doctor_name", draw_names(names, len(doctors_df)))
+    return apply_schema("doctors", doctors_df)
+
 
 # ========================================
 # 4. PATIENTS
 # ========================================
-print("\n[4/9] Generating Patients...")
-patients_data = []
-
-for pid in range(1, NUM_PATIENTS + 1):
-    # Better age distribution
-    age_group = random.choices(
-        ["child", "young", "adult", "senior", "elderly"],
-        weights=[10, 20, 30, 28, 12]
-    )[0]
-
-    age_ranges = {
-        "child": (0, 14),
-        "young": (15, 35),
-        "adult": (36, 55),
-        "senior": (56, 75),
-        "elderly": (76, 95)
-    }
+def _weights(weights):
+    weights = np.asarray(weights, dtype=float)
+    return weights / weights.sum()
+
 
-    age = random.randint(*age_ranges[age_group])
+def generate_patients(num_patients, names, first_id=1):
+    # Better age distribution: pick an age group, then an age within it
+    age_groups = np.random.choice(len(AGE_GROUPS), num_patients, p=_weights(AGE_GROUP_WEIGHTS))
+    age_low, age_high = np.array([AGE_RANGES[group] for group in AGE_GROUPS]).T
+    ages = np.random.randint(age_low[age_groups], age_high[age_groups] + 1)
 
-    patients_data.append([
-        pid, fake.name(), age,
-        random.choice(["Male", "Female"]),
-        random.choices(INSURANCE_TYPES, weights=[40, 45, 15])[0]
-    ])
+    # Categoricals are built from codes directly, never as per-row strings
+    return apply_schema("patients", pd.DataFrame({
+        "patient_id": np.arange(first_id, first_id + num_patients),
+        "patient_name": draw_names(names, num_patients),
+        "age": ages,
+        "gender": pd.Categorical.from_codes(np.random.randint(0, len(GENDERS), num_patients), GENDERS),
+        "insurance_type": pd.Categorical.from_codes(
+            np.random.choice(len(INSURANCE_TYPES), num_patients, p=_weights(INSURANCE_WEIGHTS)), INSURANCE_TYPES
+        ),
+    }))
 
-patients_df = pd.DataFrame(
-    patients_data,
-    columns=["patient_id", "patient_name", "age", "gender", "insurance_type"]
-)
-print(f"  {len(patients_df)} patients")
 
 # ========================================
 # 5. ADMISSIONS (WITH PATTERNS!)
 # ========================================
-print("\n[5/9] Generating Admissions (with seasonal patterns)...")
-admissions_data = []
-used_patients = []
-
-for aid in range(1, NUM_ADMISSIONS + 1):
-    if aid % 500 == 0:
-        print(f"  ... {aid}/{NUM_ADMISSIONS}")
-
-    # FIX: 10% READMISSIONS
-    if len(used_patients) > 100 and random.random() < 0.10:
-        patient = patients_df[patients_df["patient_id"].isin(used_patients)].sample(1).iloc[0]
-    else:
-        patient = patients_df.sample(1).iloc[0]
-        used_patients.append(patient["patient_id"])
-
-    age = patient["age"]
-
-    # FIX: Age-based department selection
-    if age < 15:
-        dept = "Pediatrics"
-    elif age > 60 and random.random() < 0.35:
-        dept = random.choices(["Cardiology", "Oncology"], weights=[60, 40])[0]
-    elif age > 50 and random.random() < 0.20:
-        dept = "Cardiology"
-    else:
-        dept = random.choice(DEPARTMENTS)
-
-    branch_id = random.choices(
-        range(1, len(BRANCHES) + 1),
-        weights=[b["beds"] for b in BRANCHES]
-    )[0]
-
-    # FIX: SEASONAL PATTERNS
-    admit_date = fake.date_time_between(START_DATE, END_DATE)
-    is_weekend = admit_date.weekday() >= 5
-
-    # FIX: Emergency probability based on time
-    if dept == "Emergency":
-        emergency_prob = 0.90
-    elif is_weekend:
-        emergency_prob = 0.45
-    else:
-        emergency_prob = 0.30
+def generate_admissions_table(patients_df, departments_df, doctors_df, num_admissions,
+                              start_date, end_date, seed=SEED, first_admission_id=1):
+    """
+    Seasonal/time-of-day admissions from admissions_engine.py; readmissions
+    are flagged inside the engine with readmissions.flag_readmissions.
+    """
+    return apply_schema("admissions", pd.concat(
+        generate_admissions(
+            patients_df, departments_df, doctors_df, num_admissions,
+            start_date, end_date, DEPARTMENTS, BRANCHES, LOS_RULES,
+            seed=seed, chunk_size=ADMISSION_CHUNK_SIZE,
+            readmission_window_days=READMISSION_WINDOW_DAYS,
+            first_admission_id=first_admission_id
+        ),
+        ignore_index=True
+    ))
 
-    is_emergency = random.random() < emergency_prob
 
-    # FIX: Time-based admission patterns
-    if is_emergency:
-        hour = random.choices(
-            list(range(24)),
-            weights=[3, 2, 2, 2, 3, 4, 5, 6, 7, 8, 7, 6, 5, 4, 4, 5, 6, 7, 8, 9, 8, 7, 6, 5]
-        )[0]
-    else:
-        hour = random.randint(8, 16)
-
-    admit_time = admit_date.replace(hour=hour, minute=random.randint(0, 59))
-
-    # FIX: Department-specific LOS
-    los = random.randint(*LOS_RULES[dept])
-
-    # FIX: Seasonal LOS variation
-    if admit_time.month in [12, 1] and dept in ["Emergency", "General Medicine"]:
-        los += random.randint(0, 2)  # Winter flu = longer stays
-
-    discharge = admit_time + timedelta(days=los, hours=random.randint(8, 16))
-    is_readmission = 0
-    dept_id = departments_df[
-        (departments_df.department_name == dept) &
-        (departments_df.branch_id == branch_id)
-        ].iloc[0]["department_id"]
-
-    doctor_id = doctors_df[
-        doctors_df.department_id == dept_id
-        ].sample(1).iloc[0]["doctor_id"]
-
-    admissions_data.append([
-        aid, patient["patient_id"], dept_id, dept,
-        branch_id, doctor_id, admit_time, discharge,
-        "Emergency" if is_emergency else "Scheduled", los
-    ])
-
-admissions_df = pd.DataFrame(
-    admissions_data,
-    columns=[
-        "admission_id", "patient_id", "department_id", "department_name",
-        "branch_id", "doctor_id", "admission_datetime",
-        "discharge_datetime", "admission_type", "length_of_stay"
-    ]
-)
-admissions_df = admissions_df.sort_values(
-    ["patient_id", "admission_datetime"]
-)
-
-admissions_df["is_readmission"] = 0
-
-for pid, group in admissions_df.groupby("patient_id"):
-    prev_discharge = None
-    for idx, row in group.iterrows():
-        if prev_discharge:
-            if (row["admission_datetime"] - prev_discharge).days <= 30:
-                admissions_df.at[idx, "is_readmission"] = 1
-        prev_discharge = row["discharge_datetime"]
-
-print(f" {len(admissions_df)} admissions")
-print("\n[5.1] Flagging 30-day readmissions...")
-admissions_df = admissions_df.sort_values(["patient_id", "admission_datetime"])
-admissions_df["is_readmission"] = 0
-
-for pid, group in admissions_df.groupby("patient_id"):
-    if len(group) > 1:
-        prev_discharge = None
-        for idx, row in group.iterrows():
-            if prev_discharge and (row["admission_datetime"] - prev_discharge).days <= 30:
-                admissions_df.at[idx, "is_readmission"] = 1
-            prev_discharge = row["discharge_datetime"]
-
-# Re-sort by admission_id to keep it clean for the SQL load
-admissions_df = admissions_df.sort_values("admission_id")
-print(f" Flagged {admissions_df['is_readmission'].sum()} readmissions")
 # ========================================
 # 6. PROCEDURES (DEPARTMENT-SPECIFIC)
 # ========================================
-print("\n[6/9] Generating Procedures...")
-procedures_data = []
-pid = 1
+def generate_procedures(admissions_df, first_id=1):
+    dept = admissions_df["department_name"]
+    los = admissions_df["length_of_stay"].to_numpy()
 
-for _, adm in admissions_df.iterrows():
     #  FIX: Department-specific procedure counts
-    if adm["department_name"] == "Oncology":
-        num_procedures = random.randint(2, 5)
-    elif adm["department_name"] == "Cardiology":
-        num_procedures = random.randint(1, 3)
-    else:
-        num_procedures = random.randint(1, 2)
-
-    for _ in range(num_procedures):
-        days_into = random.randint(0, max(0, adm["length_of_stay"] - 1))
-
-        procedures_data.append([
-            pid,
-            adm["admission_id"],
-            adm["doctor_id"],
-            random.choice(PROCEDURE_TYPES[adm["department_name"]]),
-            adm["admission_datetime"] + timedelta(days=days_into),
-            random.randint(30, 240)
-        ])
-        pid += 1
-
-procedures_df = pd.DataFrame(
-    procedures_data,
-    columns=["procedure_id", "admission_id","doctor_id",
-             "procedure_type", "procedure_datetime", "duration_minutes"]
-)
-print(f" {len(procedures_df)} procedures")
+    count_min = dept.map({d: PROCEDURE_COUNTS.get(d, (1, 2))[0] for d in DEPARTMENTS}).to_numpy()
+    count_max = dept.map({d: PROCEDURE_COUNTS.get(d, (1, 2))[1] for d in DEPARTMENTS}).to_numpy()
+    num_procedures = np.random.randint(count_min, count_max + 1)
+
+    # One row per procedure, grouped by admission in admission order
+    adm = np.repeat(np.arange(len(admissions_df)), num_procedures)
+    n = len(adm)
+    days_into = np.random.randint(0, np.maximum(los[adm] - 1, 0) + 1)
+
+    # Procedure types of all departments in one category list; each row picks
+    # uniformly within its department's slice
+    procedure_types = [t for d in DEPARTMENTS for t in PROCEDURE_TYPES[d]]
+    type_counts = np.array([len(PROCEDURE_TYPES[d]) for d in DEPARTMENTS])
+    type_offsets = np.concatenate([[0], np.cumsum(type_counts)[:-1]])
+    dept_idx = dept.map({d: i for i, d in enumerate(DEPARTMENTS)}).to_numpy()[adm]
+    type_codes = type_offsets[dept_idx] + (np.random.random(n) * type_counts[dept_idx]).astype(np.int64)
+
+    return apply_schema("procedures", pd.DataFrame({
+        "procedure_id": np.arange(first_id, first_id + n),
+        "admission_id": admissions_df["admission_id"].to_numpy()[adm],
+        "doctor_id": admissions_df["doctor_id"].to_numpy()[adm],
+        "procedure_type": pd.Categorical.from_codes(type_codes, procedure_types),
+        "procedure_datetime": admissions_df["admission_datetime"].to_numpy()[adm] + days_into * np.timedelta64(1, "D"),
+        "duration_minutes": np.random.randint(30, 241, n),
+    }))
+
+
+def admission_patients(admissions_df, patients_df):
+    """Admissions joined once with the patient attributes billing and outcomes need."""
+    return admissions_df[
+        ["admission_id", "patient_id", "department_name", "length_of_stay"]
+    ].merge(
+        patients_df[["patient_id", "age", "insurance_type"]],
+        on="patient_id", how="left"
+    )
+
 
 # ========================================
 # 7. BILLING (REALISTIC COSTS)
 # ========================================
-print("\n[7/9] Generating Billing...")
-billing_data = []
-
-for _, adm in admissions_df.iterrows():
+def generate_billing(admissions_df, patients_df, procedures_df):
+    # Precomputed lookups: procedure counts per admission and patient attributes
+    # joined once, instead of filtering both tables for every admission
+    procedure_counts = procedures_df.groupby("admission_id").size()
+    adm = admission_patients(admissions_df, patients_df)
+    n_adm = len(adm)
     dept = adm["department_name"]
-    los = adm["length_of_stay"]
+    los = adm["length_of_stay"].to_numpy()
 
     #  FIX: Department-specific cost ranges
-    base_min, base_max = COST_RULES[dept]
+    base_min = dept.map({d: r[0] // 2 for d, r in COST_RULES.items()}).to_numpy()
+    base_max = dept.map({d: r[1] // 2 for d, r in COST_RULES.items()}).to_numpy()
 
-    room_cost = random.randint(3000, 8000) * los
+    room_cost = np.random.randint(3000, 8001, n_adm) * los
 
-    num_proc = len(procedures_df[procedures_df["admission_id"] == adm["admission_id"]])
-    procedure_cost = random.randint(base_min // 2, base_max // 2) * num_proc
+    num_proc = adm["admission_id"].map(procedure_counts).fillna(0).astype(int).to_numpy()
+    procedure_cost = np.random.randint(base_min, base_max + 1) * num_proc
 
-    medicine_cost = random.randint(2000, 30000)
-    diagnostic_cost = random.randint(3000, 15000)
+    medicine_cost = np.random.randint(2000, 30001, n_adm)
+    diagnostic_cost = np.random.randint(3000, 15001, n_adm)
 
     total = room_cost + procedure_cost + medicine_cost + diagnostic_cost
 
     # FIX: Insurance-based coverage
-    patient = patients_df[patients_df["patient_id"] == adm["patient_id"]].iloc[0]
-
-    if patient["insurance_type"] == "Government":
-        insurance_covered = total * random.uniform(0.70, 0.90)
-    elif patient["insurance_type"] == "Private":
-        insurance_covered = total * random.uniform(0.60, 0.85)
-    else:
-        insurance_covered = 0
-
+    insurance = adm["insurance_type"].to_numpy()
+    coverage = np.select(
+        [insurance == "Government", insurance == "Private"],
+        [np.random.uniform(0.70, 0.90, n_adm), np.random.uniform(0.60, 0.85, n_adm)],
+        default=0.0
+    )
+    insurance_covered = total * coverage
     patient_paid = total - insurance_covered
 
-    billing_data.append([
-        adm["admission_id"],
-        room_cost,
-        procedure_cost,
-        medicine_cost,
-        diagnostic_cost,
-        total,
-        round(insurance_covered, 2),
-        round(patient_paid, 2)
-    ])
-
-billing_df = pd.DataFrame(
-    billing_data,
-    columns=[
-        "admission_id", "room_cost", "procedure_cost",
-        "medicine_cost", "diagnostic_cost",
-        "total_cost", "insurance_covered", "patient_paid"
-    ]
-)
-print(f"{len(billing_df)} billing records")
+    return apply_schema("billing", pd.DataFrame({
+        "admission_id": adm["admission_id"].to_numpy(),
+        "room_cost": room_cost,
+        "procedure_cost": procedure_cost,
+        "medicine_cost": medicine_cost,
+        "diagnostic_cost": diagnostic_cost,
+        "total_cost": total,
+        "insurance_covered": np.round(insurance_covered, 2),
+        "patient_paid": np.round(patient_paid, 2)
+    }))
+
 
 # ========================================
 # 8. OUTCOMES (DEPARTMENT-SPECIFIC)
 # ========================================
-print("\n[8/9] Generating Outcomes...")
-outcomes_data = []
-
-for _, adm in admissions_df.iterrows():
+def generate_outcomes(admissions_df, patients_df):
+    adm = admission_patients(admissions_df, patients_df)
     dept = adm["department_name"]
-    patient = patients_df[patients_df["patient_id"] == adm["patient_id"]].iloc[0]
 
     #FIX: Realistic outcome distributions
-    if dept == "Oncology":
-        outcome = random.choices(OUTCOMES, weights=[50, 30, 15, 5])[0]
-    elif dept == "Emergency":
-        outcome = random.choices(OUTCOMES, weights=[60, 25, 10, 5])[0]
-    elif patient["age"] > 75:
-        outcome = random.choices(OUTCOMES, weights=[60, 25, 12, 3])[0]
-    else:
-        outcome = random.choices(OUTCOMES, weights=[75, 20, 4, 1])[0]
-
-    outcomes_data.append([adm["admission_id"], outcome])
+    outcome_weights = np.array([
+        [50, 30, 15, 5],  # Oncology
+        [60, 25, 10, 5],  # Emergency
+        [60, 25, 12, 3],  # Patients over 75
+        [75, 20, 4, 1]    # Everyone else
+    ], dtype=float)
+    outcome_cdf = np.cumsum(outcome_weights / outcome_weights.sum(axis=1, keepdims=True), axis=1)
+    outcome_cdf[:, -1] = 1.0
+
+    outcome_case = np.select(
+        [dept == "Oncology", dept == "Emergency", adm["age"] > 75],
+        [0, 1, 2],
+        default=3
+    )
+    outcome_idx = (np.random.random(len(adm))[:, None] >= outcome_cdf[outcome_case]).sum(axis=1)
+
+    return apply_schema("outcomes", pd.DataFrame({
+        "admission_id": adm["admission_id"].to_numpy(),
+        "outcome": pd.Categorical.from_codes(outcome_idx, OUTCOMES)
+    }))
 
-outcomes_df = pd.DataFrame(
-    outcomes_data,
-    columns=["admission_id", "outcome"]
-)
-print(f" {len(outcomes_df)} outcomes")
 
 # ========================================
 # 9. BED OCCUPANCY (CRITICAL!)
 # ========================================
-print("\n[9/9] Generating Bed Occupancy snapshots...")
-bed_occupancy_data = []
-snapshot_id = 1
+def generate_bed_occupancy(admissions_df, departments_df, start_date, end_date,
+                           freq=SNAPSHOT_FREQUENCY):
+    return apply_schema(
+        "bed_occupancy", compute_bed_occupancy(admissions_df, departments_df, start_date, end_date, freq=freq)
+    )
 
-current_date = START_DATE
-while current_date <= END_DATE:
-    snapshot_time = current_date.replace(hour=8, minute=0)
 
-    for _, dept in departments_df.iterrows():
-        # Count active admissions at this time
-        active = admissions_df[
-            (admissions_df["department_id"] == dept["department_id"]) &
-            (admissions_df["admission_datetime"] <= snapshot_time) &
-            (admissions_df["discharge_datetime"] >= snapshot_time)
-            ]
-
-        occupied = min(len(active), dept["total_beds"])
-        occupancy_rate = (occupied / dept["total_beds"] * 100) if dept["total_beds"] > 0 else 0
-
-        bed_occupancy_data.append([
-            snapshot_id,
-            dept["department_id"],
-            dept["department_name"],
-            dept["branch_id"],
-            snapshot_time,
-            occupied,
-            dept["total_beds"],
-            round(occupancy_rate, 2)
-        ])
-        snapshot_id += 1
-
-    current_date += timedelta(days=1)
-
-bed_occupancy_df = pd.DataFrame(
-    bed_occupancy_data,
-    columns=["snapshot_id", "department_id", "department_name",
-             "branch_id", "snapshot_datetime", "occupied_beds",
-             "total_beds", "occupancy_rate"]
-)
-print(f" {len(bed_occupancy_df)} snapshots")
-print("\n" + "=" * 70)
-print("EXPORTING CSV FILES")
-print("=" * 70)
-
-
-os.makedirs("csv_data", exist_ok=True)
-
-branches_df.to_csv("csv_data/branches.csv", index=False)
-departments_df.to_csv("csv_data/departments.csv", index=False)
-doctors_df.to_csv("csv_data/doctors.csv", index=False)
-patients_df.to_csv("csv_data/patients.csv", index=False)
-admissions_df.to_csv("csv_data/admissions.csv", index=False)
-procedures_df.to_csv("csv_data/procedures.csv", index=False)
-billing_df.to_csv("csv_data/billing.csv", index=False)
-outcomes_df.to_csv("csv_data/outcomes.csv", index=False)
-bed_occupancy_df.to_csv("csv_data/bed_occupancy.csv", index=False)
-
-print("CSV files generated successfully in /csv_data folder")
-print("Step 1 complete — Data generation isolated")
-print("=" * 70)
+# ========================================
+# DRIVER
+# ========================================
+# stage -> (title, tables it needs), in generation order
+STAGES = {
+    "branches": ("Branches", []),
+    "departments": ("Departments", []),
+    "doctors": ("Doctors", ["departments"]),
+    "patients": ("Patients", []),
+    "admissions": ("Admissions (with seasonal patterns)", ["patients", "departments", "doctors"]),
+    "procedures": ("Procedures", ["admissions"]),
+    "billing": ("Billing", ["admissions", "patients", "procedures"]),
+    "outcomes": ("Outcomes", ["admissions", "patients"]),
+    "bed_occupancy": ("Bed Occupancy snapshots", ["admissions", "departments"]),
+}
+
+
+def _stage_call(name, tables, names, num_patients, num_admissions, start_date, end_date, seed):
+    if name == "branches":
+        return generate_branches()
+    if name == "departments":
+        return generate_departments()
+    if name == "doctors":
+        return generate_doctors(tables["departments"], names)
+    if name == "patients":
+        return generate_patients(num_patients, names)
+    if name == "admissions":
+        return generate_admissions_table(
+            tables["patients"], tables["departments"], tables["doctors"],
+            num_admissions, start_date, end_date, seed=seed
+        )
+    if name == "procedures":
+        return generate_procedures(tables["admissions"])
+    if name == "billing":
+        return generate_billing(tables["admissions"], tables["patients"], tables["procedures"])
+    if name == "outcomes":
+        return generate_outcomes(tables["admissions"], tables["patients"])
+    if name == "bed_occupancy":
+        return generate_bed_occupancy(tables["admissions"], tables["departments"], start_date, end_date)
+    raise ValueError(f"Unknown stage {name!r}, expected one of {list(STAGES)}")
+
+
+def resolve_stages(stages=None):
+    """Requested stages plus everything they depend on, in generation order."""
+    if stages is None:
+        return list(STAGES)
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        raise ValueError(f"Unknown stage(s) {unknown}, expected some of {list(STAGES)}")
+    needed = set()
+    pending = list(stages)
+    while pending:
+        stage = pending.pop()
+        if stage not in needed:
+            needed.add(stage)
+            pending.extend(STAGES[stage][1])
+    return [s for s in STAGES if s in needed]
+
+
+def _measure(name, fn, metrics, trace_memory=True, profile_dir=None):
+    """Run one stage, store its metrics under `name` and return its DataFrame."""
+    if trace_memory:
+        tracemalloc.reset_peak()
+    profiler = cProfile.Profile() if profile_dir else None
+
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    df = fn()
+    if profiler:
+        profiler.disable()
+    seconds = time.perf_counter() - start
+
+    metrics[name] = {
+        "seconds": round(seconds, 3),
+        "peak_mb": round(tracemalloc.get_traced_memory()[1] / 2**20, 1) if trace_memory else None,
+        "rows": len(df),
+    }
+    if profiler:
+        profiler.dump_stats(os.path.join(profile_dir, f"{name}.prof"))
+    return df
+
+
+def generate(num_patients=NUM_PATIENTS, num_admissions=NUM_ADMISSIONS,
+             start_date=START_DATE, end_date=END_DATE, stages=None, seed=SEED,
+             trace_memory=True, profile_dir=None, verbose=True):
+    """
+    Run the requested stages (and the ones they need) and return (tables,
+    metrics), metrics being stage -> {"seconds", "peak_mb", "rows"}.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    names = load_name_pool()
+    run = resolve_stages(stages)
+
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+    tracing = trace_memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+
+    tables = {}
+    metrics = {}
+    try:
+        for step, name in enumerate(run, 1):
+            if verbose:
+                print(f"\n[{step}/{len(run)}] Generating {STAGES[name][0]}...")
+            tables[name] = _measure(
+                name,
+                lambda: _stage_call(name, tables, names, num_patients, num_admissions, start_date, end_date, seed),
+                metrics, trace_memory, profile_dir,
+            )
+            if verbose:
+                peak = f", peak {metrics[name]['peak_mb']} MB" if trace_memory else ""
+                print(f" {metrics[name]['rows']} rows in {metrics[name]['seconds']}s{peak}")
+    finally:
+        if tracing:
+            tracemalloc.stop()
+
+    return tables, metrics
+
+
+def write_tables(tables, output_dir=OUTPUT_DIR, output_format=OUTPUT_FORMAT):
+    """Write every table to <output_dir>/<table>.<csv|parquet>; returns seconds taken."""
+    start = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    for table, df in tables.items():
+        _write_table(df, os.path.join(output_dir, f"{table}.{output_format}"), output_format)
+    return time.perf_counter() - start
+
+
+# ========================================
+# STREAMED GENERATION
+# ========================================
+# Tables written chunk by chunk, one admission chunk at a time
+STREAM_TABLES = ["admissions", "procedures", "billing", "outcomes"]
+
+
+def _add_metrics(metrics, name, seconds, rows):
+    stage = metrics.setdefault(name, {"seconds": 0.0, "peak_mb": None, "rows": 0})
+    stage["seconds"] = round(stage["seconds"] + seconds, 3)
+    stage["rows"] += rows
+
+
+def generate_streaming(num_patients=NUM_PATIENTS, num_admissions=NUM_ADMISSIONS,
+                       start_date=START_DATE, end_date=END_DATE, seed=SEED, chunk_size=ADMISSION_CHUNK_SIZE,
+                       output_dir=OUTPUT_DIR, output_format=OUTPUT_FORMAT, verbose=True):
+    """
+    Generate the dataset and write it to output_dir with STREAM_TABLES
+    appended one admission chunk at a time, so no table of admission size
+    is ever held whole. Returns per-stage metrics (summed over chunks) and
+    the number of flagged readmissions.
+    """
+    start = time.perf_counter()
+    dims, metrics = generate(
+        num_patients=num_patients, stages=["branches", "departments", "doctors", "patients"],
+        seed=seed, trace_memory=False, verbose=False
+    )
+    patients_df = dims["patients"]
+    departments_df = dims["departments"]
+    snapshots = snapshot_times(start_date, end_date, SNAPSHOT_FREQUENCY)
+    counts = np.zeros((len(snapshots), len(departments_df)), dtype=np.int64)
+    readmissions = 0
+
+    os.makedirs(output_dir, exist_ok=True)
+    chunks = generate_admissions(
+        patients_df, departments_df, dims["doctors"], num_admissions,
+        start_date, end_date, DEPARTMENTS, BRANCHES, LOS_RULES,
+        seed=seed, chunk_size=chunk_size, readmission_window_days=READMISSION_WINDOW_DAYS
+    )
+    with contextlib.ExitStack() as stack:
+        writers = {
+            table: stack.enter_context(ChunkWriter(
+                os.path.join(output_dir, f"{table}.{output_format}"), output_format, PARQUET_COMPRESSION
+            ))
+            for table in STREAM_TABLES
+        }
+        while True:
+            t = time.perf_counter()
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            admissions_df = apply_schema("admissions", chunk)
+            _add_metrics(metrics, "admissions", time.perf_counter() - t, len(admissions_df))
+
+            t = time.perf_counter()
+            procedures_df = generate_procedures(admissions_df, first_id=writers["procedures"].rows + 1)
+            _add_metrics(metrics, "procedures", time.perf_counter() - t, len(procedures_df))
+            t = time.perf_counter()
+            billing_df = generate_billing(admissions_df, patients_df, procedures_df)
+            _add_metrics(metrics, "billing", time.perf_counter() - t, len(billing_df))
+            t = time.perf_counter()
+            outcomes_df = generate_outcomes(admissions_df, patients_df)
+            _add_metrics(metrics, "outcomes", time.perf_counter() - t, len(outcomes_df))
+
+            counts += occupancy_counts(admissions_df, departments_df["department_id"], snapshots)
+            readmissions += int(admissions_df["is_readmission"].sum())
+
+            t = time.perf_counter()
+            for table, df in zip(STREAM_TABLES, [admissions_df, procedures_df, billing_df, outcomes_df]):
+                writers[table].write(df)
+            _add_metrics(metrics, "export", time.perf_counter() - t, 0)
+            if verbose:
+                print(f" {writers['admissions'].rows}/{num_admissions} admissions written")
+
+    dims["bed_occupancy"] = _measure(
+        "bed_occupancy", lambda: apply_schema("bed_occupancy", build_bed_occupancy(counts, departments_df, snapshots)),
+        metrics, trace_memory=False
+    )
+    _add_metrics(metrics, "export", write_tables(dims, output_dir, output_format), 0)
+    return {
+        "wall_seconds": round(time.perf_counter() - start, 3),
+        "readmissions": readmissions,
+        "stages": metrics,
+    }
+
+
+# ========================================
+# SHARDED GENERATION
+# ========================================
+# Tables generated per shard and written as <table>/part-NNNN files
+SHARD_TABLES = ["patients", "admissions", "procedures", "billing", "outcomes"]
+# Upper bound of generate_procedures per admission; sizes each shard's procedure_id range
+MAX_PROCEDURES_PER_ADMISSION = max(high for _, high in PROCEDURE_COUNTS.values())
+
+
+def shard_sizes(total, num_shards):
+    """(offset, count) of each shard for `total` items split as evenly as possible."""
+    base, extra = divmod(total, num_shards)
+    sizes = [base + (1 if k < extra else 0) for k in range(num_shards)]
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    return [(int(o), n) for o, n in zip(offsets, sizes)]
+
+
+def shard_seeds(seed, num_shards):
+    """Independent per-shard seeds derived from `seed`."""
+    return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(num_shards)]
+
+
+def part_path(output_dir, table, shard, output_format):
+    return os.path.join(output_dir, table, f"part-{shard:04d}.{output_format}")
+
+
+def _write_table(df, path, output_format):
+    if output_format == "parquet":
+        df.to_parquet(path, index=False, compression=PARQUET_COMPRESSION)
+    else:
+        df.to_csv(path, index=False)
+
+
+def _generate_shard(task):
+    """Process-pool worker: generate and write one shard; returns its metrics and occupancy counts."""
+    shard = task["shard"]
+    seed = task["seed"]
+    random.seed(seed)
+    np.random.seed(seed)
+    names = load_name_pool()
+    departments_df = task["departments"]
+    metrics = {}
+
+    patients_df = _measure("patients", lambda: generate_patients(
+        task["num_patients"], names, first_id=task["patient_offset"] + 1
+    ), metrics, trace_memory=False)
+    admissions_df = _measure("admissions", lambda: generate_admissions_table(
+        patients_df, departments_df, task["doctors"], task["num_admissions"],
+        task["start_date"], task["end_date"], seed=seed,
+        first_admission_id=task["admission_offset"] + 1
+    ), metrics, trace_memory=False)
+    procedures_df = _measure("procedures", lambda: generate_procedures(
+        admissions_df, first_id=task["admission_offset"] * MAX_PROCEDURES_PER_ADMISSION + 1
+    ), metrics, trace_memory=False)
+    billing_df = _measure("billing", lambda: generate_billing(
+        admissions_df, patients_df, procedures_df
+    ), metrics, trace_memory=False)
+    outcomes_df = _measure("outcomes", lambda: generate_outcomes(
+        admissions_df, patients_df
+    ), metrics, trace_memory=False)
+
+    counts = occupancy_counts(admissions_df, departments_df["department_id"], task["snapshots"])
+
+    start = time.perf_counter()
+    tables = {
+        "patients": patients_df, "admissions": admissions_df, "procedures": procedures_df,
+        "billing": billing_df, "outcomes": outcomes_df,
+    }
+    for table, df in tables.items():
+        _write_table(df, part_path(task["output_dir"], table, shard, task["output_format"]), task["output_format"])
+    metrics["export"] = {"seconds": round(time.perf_counter() - start, 3)}
+    return shard, metrics, counts
+
+
+def generate_sharded(num_shards, workers=None, num_patients=NUM_PATIENTS, num_admissions=NUM_ADMISSIONS,
+                     start_date=START_DATE, end_date=END_DATE, seed=SEED,
+                     output_dir=OUTPUT_DIR, output_format=OUTPUT_FORMAT, verbose=True):
+    """
+    Generate the dataset in `num_shards` patient blocks on `workers` processes
+    (default: one per CPU) and write it to output_dir. Branches, departments,
+    doctors and bed_occupancy are written as single files, SHARD_TABLES as
+    <table>/part-NNNN files. Returns per-shard and overall metrics.
+    """
+    start = time.perf_counter()
+    dims, metrics = generate(
+        stages=["branches", "departments", "doctors"], seed=seed, trace_memory=False, verbose=False
+    )
+    departments_df = dims["departments"]
+    snapshots = snapshot_times(start_date, end_date, SNAPSHOT_FREQUENCY)
+
+    for table in SHARD_TABLES:
+        # Stale output would be loaded alongside (or instead of) the new parts
+        os.makedirs(os.path.join(output_dir, table), exist_ok=True)
+        for stale in glob.glob(os.path.join(output_dir, table, "part-*")):
+            os.remove(stale)
+        single = os.path.join(output_dir, f"{table}.{output_format}")
+        if os.path.exists(single):
+            os.remove(single)
+
+    patient_blocks = shard_sizes(num_patients, num_shards)
+    admission_blocks = shard_sizes(num_admissions, num_shards)
+    tasks = [
+        {
+            "shard": k, "seed": shard_seed,
+            "patient_offset": patient_blocks[k][0], "num_patients": patient_blocks[k][1],
+            "admission_offset": admission_blocks[k][0], "num_admissions": admission_blocks[k][1],
+            "departments": departments_df, "doctors": dims["doctors"],
+            "start_date": start_date, "end_date": end_date, "snapshots": snapshots,
+            "output_dir": output_dir, "output_format": output_format,
+        }
+        for k, shard_seed in enumerate(shard_seeds(seed, num_shards))
+    ]
+
+    counts = np.zeros((len(snapshots), len(departments_df)), dtype=np.int64)
+    shard_metrics = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for shard, stage_metrics, shard_counts in pool.map(_generate_shard, tasks):
+            counts += shard_counts
+            shard_metrics[shard] = stage_metrics
+            if verbose:
+                print(f" shard {shard + 1}/{num_shards}: {stage_metrics['admissions']['rows']} admissions")
+
+    dims["bed_occupancy"] = _measure(
+        "bed_occupancy", lambda: apply_schema("bed_occupancy", build_bed_occupancy(counts, departments_df, snapshots)),
+        metrics, trace_memory=False
+    )
+    metrics["export"] = {"seconds": round(write_tables(dims, output_dir, output_format), 3)}
+    return {
+        "shards": num_shards,
+        "wall_seconds": round(time.perf_counter() - start, 3),
+        "stages": metrics,
+        "shard_stages": shard_metrics,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hospital analytics data generator")
+    parser.add_argument("--patients", type=int, default=NUM_PATIENTS)
+    parser.add_argument("--admissions", type=int, default=NUM_ADMISSIONS)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES),
+                        help="run only these stages (and the stages they need)")
+    parser.add_argument("--format", choices=["csv", "parquet"], default=OUTPUT_FORMAT)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc peak tracking")
+    parser.add_argument("--profile", metavar="DIR", help="write a cProfile dump per stage to DIR")
+    parser.add_argument("--metrics", metavar="FILE", help="write per-stage metrics as JSON to FILE")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="generate in this many patient shards on a process pool")
+    parser.add_argument("--workers", type=int, help="worker processes for --shards (default: CPU count)")
+    parser.add_argument("--stream", action="store_true",
+                        help="write admissions, procedures, billing and outcomes chunk by chunk (bounded memory)")
+    parser.add_argument("--chunk-size", type=int, default=ADMISSION_CHUNK_SIZE,
+                        help="admissions per chunk for --stream")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("HOSPITAL ANALYTICS DATA GENERATOR - SQL Server")
+    print("=" * 70)
+
+    if args.stream:
+        if args.stages or args.shards > 1:
+            parser.error("--stream cannot be combined with --stages or --shards")
+        metrics = generate_streaming(
+            num_patients=args.patients, num_admissions=args.admissions, seed=args.seed,
+            chunk_size=args.chunk_size, output_dir=args.output_dir, output_format=args.format,
+        )
+        if args.metrics:
+            with open(args.metrics, "w") as f:
+                json.dump(metrics, f, indent=2)
+        print(f"\n Flagged {metrics['readmissions']} readmissions")
+        print(f"{args.format.upper()} files streamed in {metrics['wall_seconds']}s to /{args.output_dir} folder")
+        print("=" * 70)
+        return
+
+    if args.shards > 1:
+        if args.stages:
+            parser.error("--stages cannot be combined with --shards")
+        metrics = generate_sharded(
+            args.shards, workers=args.workers, num_patients=args.patients, num_admissions=args.admissions,
+            seed=args.seed, output_dir=args.output_dir, output_format=args.format,
+        )
+        if args.metrics:
+            with open(args.metrics, "w") as f:
+                json.dump(metrics, f, indent=2)
+        print(f"{args.shards} shards generated in {metrics['wall_seconds']}s in /{args.output_dir} folder")
+        print("=" * 70)
+        return
+
+    tables, metrics = generate(
+        num_patients=args.patients, num_admissions=args.admissions, stages=args.stages,
+        seed=args.seed, trace_memory=not args.no_memory, profile_dir=args.profile,
+    )
+    if "admissions" in tables:
+        print(f"\n Flagged {tables['admissions']['is_readmission'].sum()} readmissions")
+
+    print("\n" + "=" * 70)
+    print(f"EXPORTING {args.format.upper()} FILES")
+    print("=" * 70)
+    metrics["export"] = {"seconds": round(write_tables(tables, args.output_dir, args.format), 3)}
+
+    if args.metrics:
+        with open(args.metrics, "w") as f:
+            json.dump(metrics, f, indent=2)
+
+    print(f"{args.format.upper()} files generated successfully in /{args.output_dir} folder")
+    print("Step 1 complete — Data generation isolated")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
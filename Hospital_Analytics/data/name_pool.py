@@ -0,0 +1,58 @@
+"""
+Name pool for the data generator: NAME_POOL_SIZE en_IN names generated
+once with a fixed seed and cached, then drawn in batches by index instead
+of one Faker call per row.
+"""
+import os
+
+import numpy as np
+from faker import Faker
+
+NAME_LOCALE = "en_IN"
+NAME_POOL_SIZE = 100_000
+NAME_POOL_SEED = 42
+NAME_POOL_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+# Pools already loaded in this process, by (locale, size, seed)
+_pools = {}
+
+
+def name_pool_path(locale=NAME_LOCALE, size=NAME_POOL_SIZE, seed=NAME_POOL_SEED, cache_dir=NAME_POOL_CACHE_DIR):
+    return os.path.join(cache_dir, f"names_{locale}_{size}_{seed}.txt")
+
+
+def build_name_pool(locale=NAME_LOCALE, size=NAME_POOL_SIZE, seed=NAME_POOL_SEED):
+    fake = Faker(locale)
+    fake.seed_instance(seed)
+    return np.array([fake.name() for _ in range(size)], dtype=object)
+
+
+def load_name_pool(locale=NAME_LOCALE, size=NAME_POOL_SIZE, seed=NAME_POOL_SEED, cache_dir=NAME_POOL_CACHE_DIR):
+    """
+    The name pool as an object array, from memory, else from the cache
+    file, else built with Faker and written to the cache file.
+    """
+    key = (locale, size, seed)
+    if key in _pools:
+        return _pools[key]
+
+    path = name_pool_path(locale, size, seed, cache_dir)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            pool = np.array(f.read().splitlines(), dtype=object)
+    else:
+        pool = build_name_pool(locale, size, seed)
+        os.makedirs(cache_dir, exist_ok=True)
+        # Written aside and renamed, so concurrent shard processes never read a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(pool) + "\n")
+        os.replace(tmp_path, path)
+
+    _pools[key] = pool
+    return pool
+
+
+def draw_names(pool, n):
+    """`n` names drawn uniformly, with replacement, from `pool`."""
+    return pool[np.random.randint(0, len(pool), n)]
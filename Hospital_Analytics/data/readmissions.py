@@ -0,0 +1,51 @@
+"""
+30-day readmission flagging with a grouped `shift` over sorted rows; the
+last discharge of patients seen in earlier batches is passed in as
+`previous_discharge`.
+"""
+import numpy as np
+import pandas as pd
+
+READMISSION_WINDOW_DAYS = 30
+
+
+def flag_readmissions(admissions_df, window_days=READMISSION_WINDOW_DAYS, previous_discharge=None):
+    """
+    0/1 `is_readmission` Series aligned with admissions_df.
+
+    previous_discharge: optional Series of patient_id -> discharge_datetime
+    of the patient's last admission before these rows.
+    """
+    flags = np.zeros(len(admissions_df), dtype=np.int64)
+    if len(admissions_df):
+        rows = admissions_df[["patient_id", "admission_datetime", "discharge_datetime"]].reset_index(drop=True)
+        rows = rows.sort_values(["patient_id", "admission_datetime"], kind="stable")
+
+        prev = rows.groupby("patient_id", sort=False)["discharge_datetime"].shift()
+        if previous_discharge is not None and len(previous_discharge):
+            # Only a patient's first row looks back past these rows; a later
+            # row follows an earlier one here, even one without a discharge yet
+            first = ~rows["patient_id"].duplicated()
+            prev = prev.mask(first, rows["patient_id"].map(previous_discharge))
+
+        # Same rule as `(admit - prev_discharge).days <= window_days`,
+        # including overlapping stays; patients without history compare as NaT
+        gap = rows["admission_datetime"] - prev
+        flags[rows.index.to_numpy()] = (gap < pd.Timedelta(days=window_days + 1)).to_numpy()
+
+    return pd.Series(flags, index=admissions_df.index, name="is_readmission")
+
+
+def last_discharge_by_patient(admissions_df, previous_discharge=None):
+    """
+    patient_id -> discharge_datetime of each patient's latest admission,
+    merged over `previous_discharge` for patients not in admissions_df.
+    """
+    latest = (
+        admissions_df.sort_values("admission_datetime", kind="stable")
+        .groupby("patient_id")["discharge_datetime"]
+        .last()
+    )
+    if previous_discharge is None or not len(previous_discharge):
+        return latest
+    return latest.combine_first(previous_discharge)
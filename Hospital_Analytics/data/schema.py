@@ -0,0 +1,66 @@
+"""
+Compact pandas dtypes of the nine tables (categoricals, narrow ints,
+datetime64), shared by the data generator and the ETL loader.
+"""
+
+TABLE_DTYPES = {
+    "branches": {
+        "branch_id": "int16", "branch_name": "category", "city": "category", "total_beds": "int16",
+    },
+    "departments": {
+        "department_id": "int16", "department_name": "category", "branch_id": "int16",
+        "total_beds": "int16",
+    },
+    "doctors": {
+        "doctor_id": "int32", "doctor_name": "str", "department_id": "int16",
+        "department_name": "category", "available_hours": "int16", "booked_hours": "int16",
+    },
+    "patients": {
+        "patient_id": "int32", "patient_name": "str", "age": "int8", "gender": "category",
+        "insurance_type": "category",
+    },
+    "admissions": {
+        "admission_id": "int32", "patient_id": "int32", "department_id": "int16",
+        "department_name": "category", "branch_id": "int16", "doctor_id": "int32",
+        "admission_datetime": "datetime64[ns]", "discharge_datetime": "datetime64[ns]",
+        "admission_type": "category", "length_of_stay": "int16", "is_readmission": "int8",
+    },
+    "procedures": {
+        "procedure_id": "int32", "admission_id": "int32", "doctor_id": "int32",
+        "procedure_type": "category", "procedure_datetime": "datetime64[ns]",
+        "duration_minutes": "int16",
+    },
+    "billing": {
+        "admission_id": "int32", "room_cost": "int32", "procedure_cost": "int32",
+        "medicine_cost": "int32", "diagnostic_cost": "int32", "total_cost": "int32",
+        "insurance_covered": "float64", "patient_paid": "float64",
+    },
+    "outcomes": {
+        "admission_id": "int32", "outcome": "category",
+    },
+    "bed_occupancy": {
+        # occupied_beds is capped at total_beds (see occupancy.build_bed_occupancy)
+        "snapshot_id": "int32", "department_id": "int16", "department_name": "category",
+        "branch_id": "int16", "snapshot_datetime": "datetime64[ns]", "occupied_beds": "int32",
+        "total_beds": "int16", "occupancy_rate": "float64",
+    },
+}
+
+DATETIME_COLUMNS = {
+    table: [name for name, dtype in dtypes.items() if dtype.startswith("datetime64")]
+    for table, dtypes in TABLE_DTYPES.items()
+}
+
+
+def read_dtypes(table):
+    """`dtype=` argument for pd.read_csv: every column but the datetime ones (use parse_dates)."""
+    return {
+        name: dtype for name, dtype in TABLE_DTYPES[table].items()
+        if name not in DATETIME_COLUMNS[table]
+    }
+
+
+def apply_schema(table, df):
+    """`df` with its columns cast to the table's dtypes; columns outside the schema are left as they are."""
+    dtypes = {name: dtype for name, dtype in TABLE_DTYPES[table].items() if name in df.columns}
+    return df.astype(dtypes)
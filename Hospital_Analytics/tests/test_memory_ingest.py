@@ -0,0 +1,203 @@
+"""
+Backend checks against the bundled CSVs: ingest on the in-memory backend,
+readmission windows, the KPI cache, alert cursors and incremental loads.
+
+    python -m pytest Hospital_Analytics/tests
+"""
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "backend"))
+
+import data_path  # noqa: E402,F401
+import pandas as pd  # noqa: E402
+import pytest  # noqa: E402
+from bed_alerts import InvalidCursor, decode_cursor, encode_cursor, fetch_alerts_page  # noqa: E402
+from cache import TTLCache, cached  # noqa: E402
+from etl import TABLES, run_load  # noqa: E402
+from ingest import IngestError, ingest_admissions, ingest_discharges  # noqa: E402
+from kpis import fetch_records  # noqa: E402
+from memory_backend import load_memory_engine  # noqa: E402
+from readmissions import flag_readmissions  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from trends import bucket_start  # noqa: E402
+
+CSV_DATA = os.path.join(HERE, "..", "data", "csv_data")
+
+BATCHES = 10
+EVENTS_PER_BATCH = 30
+READER_THREADS = 4
+
+ADMISSIONS_QUERY = "SELECT COUNT(*) AS n FROM admissions"
+ROLLUP_QUERY = "SELECT SUM(admissions) AS n FROM kpi_admission_rollup"
+
+
+def latest(engine, query):
+    value = fetch_records(engine, query)[0]["at"]
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def admission(patient_id, at):
+    return {
+        "patient_id": patient_id, "department_id": 1, "doctor_id": 1,
+        "admission_datetime": at, "admission_type": "Scheduled",
+    }
+
+
+def test_ingest_survives_concurrent_reads():
+    # A query returning the shared connection must not roll back an ingest
+    engine, _ = load_memory_engine(CSV_DATA)
+    admissions_before = fetch_records(engine, ADMISSIONS_QUERY)[0]["n"]
+    rollup_before = fetch_records(engine, ROLLUP_QUERY)[0]["n"]
+    last = latest(engine, "SELECT MAX(admission_datetime) AS at FROM admissions")
+
+    stop = threading.Event()
+    errors = []
+
+    def read():
+        try:
+            while not stop.is_set():
+                fetch_records(engine, "SELECT COUNT(*) AS n FROM bed_occupancy")
+        except Exception as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(READER_THREADS)]
+    for reader in readers:
+        reader.start()
+    try:
+        n = 0
+        for _ in range(BATCHES):
+            events = []
+            for _ in range(EVENTS_PER_BATCH):
+                n += 1
+                events.append({
+                    "patient_id": 1 + n % 500,
+                    "department_id": 1 + n % 18,
+                    "doctor_id": 1,
+                    "admission_datetime": last + timedelta(minutes=n),
+                    "admission_type": "Emergency",
+                })
+            ingest_admissions(engine, events)
+    finally:
+        stop.set()
+        for reader in readers:
+            reader.join()
+
+    assert not errors
+    ingested = BATCHES * EVENTS_PER_BATCH
+    assert fetch_records(engine, ADMISSIONS_QUERY)[0]["n"] - admissions_before == ingested
+    assert fetch_records(engine, ROLLUP_QUERY)[0]["n"] - rollup_before == ingested
+
+
+def test_ingest_batch_readmissions_follow_earlier_rows():
+    engine, _ = load_memory_engine(CSV_DATA)
+    patient_id = fetch_records(engine, "SELECT MAX(patient_id) AS n FROM patients")[0]["n"] + 1
+    start = latest(engine, "SELECT MAX(admission_datetime) AS at FROM admissions")
+
+    [first] = ingest_admissions(engine, [admission(patient_id, start)])
+    ingest_discharges(engine, [{"admission_id": first["admission_id"], "discharge_datetime": start + timedelta(hours=1)}])
+
+    # Out of order: the earlier admission is a readmission; the later one
+    # follows a stay that is still open, not the stored discharge
+    later, earlier = ingest_admissions(engine, [
+        admission(patient_id, start + timedelta(days=2)),
+        admission(patient_id, start + timedelta(days=1)),
+    ])
+    assert (earlier["is_readmission"], later["is_readmission"]) == (1, 0)
+    assert first["admission_id"] < earlier["admission_id"] < later["admission_id"]
+
+
+def test_ingest_rejects_events_past_the_horizon():
+    engine, _ = load_memory_engine(CSV_DATA)
+    last = latest(engine, "SELECT MAX(snapshot_datetime) AS at FROM bed_occupancy")
+    snapshots = fetch_records(engine, "SELECT COUNT(*) AS n FROM bed_occupancy")[0]["n"]
+
+    with pytest.raises(IngestError):
+        ingest_admissions(engine, [admission(1, last + timedelta(days=365))])
+    assert fetch_records(engine, "SELECT COUNT(*) AS n FROM bed_occupancy")[0]["n"] == snapshots
+
+
+def test_flag_readmissions_window_edges():
+    discharged = datetime(2025, 9, 1, 12)
+    day = timedelta(days=1)
+    rows = pd.DataFrame({
+        "patient_id": [1, 1, 2, 2, 3],
+        "admission_datetime": [
+            discharged - day, discharged + 31 * day - timedelta(minutes=1),
+            discharged - day, discharged + 31 * day,
+            discharged + 30 * day,
+        ],
+        "discharge_datetime": [discharged, pd.NaT, discharged, pd.NaT, pd.NaT],
+    }, index=[10, 11, 12, 13, 14])
+    previous = pd.Series({3: discharged})
+
+    flags = flag_readmissions(rows.iloc[::-1], 30, previous)
+    assert flags.to_dict() == {14: 1, 13: 0, 12: 0, 11: 1, 10: 0}
+
+
+def test_cache_drops_results_computed_across_a_clear():
+    cache = TTLCache()
+    calls = []
+
+    @cached(cache)
+    def query(n):
+        calls.append(n)
+        cache.clear()  # a load finishing while the query runs
+        return n
+
+    assert query(1) == 1 and query(1) == 1
+    assert len(calls) == 2
+
+    generation = cache.generation
+    cache.set("key", "value", generation)
+    assert cache.get("key", None) == "value"
+    cache.clear()
+    cache.set("key", "stale", generation)
+    assert cache.get("key", None) is None
+
+
+def test_alert_cursor_pages_match_one_query():
+    engine, _ = load_memory_engine(CSV_DATA)
+    everything = fetch_alerts_page(engine, limit=5000)
+    assert everything["next_cursor"] is None and everything["items"]
+
+    row = everything["items"][0]
+    rate, snapshot_datetime, snapshot_id = decode_cursor(encode_cursor(row))
+    assert (rate, snapshot_datetime, snapshot_id) == (row["occupancy_rate"], row["snapshot_datetime"], row["snapshot_id"])
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor")
+
+    # A page exactly as long as what is left has no next page
+    total = len(everything["items"])
+    assert fetch_alerts_page(engine, limit=total)["next_cursor"] is None
+    items, cursor = [], None
+    while True:
+        page = fetch_alerts_page(engine, limit=total - 1 if total > 1 else 1, cursor=cursor)
+        items += page["items"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert items == everything["items"]
+
+
+def test_incremental_load_of_unchanged_files(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'hospital.db'}")
+    run_load(engine, CSV_DATA)
+    report = run_load(engine, CSV_DATA, mode="incremental")
+    engine.dispose()
+    assert {report[t]["status"] for t in TABLES} == {"unchanged"}
+
+
+@pytest.mark.parametrize("stored, week", [
+    ("2025-09-01 00:00:00.000000", "2025-09-01"),  # Monday
+    ("2025-09-07 23:59:59.999999", "2025-09-01"),  # Sunday
+    ("2025-09-08 00:00:00.000000", "2025-09-08"),
+    ("2026-01-01 12:00:00.000000", "2025-12-29"),  # across a year end
+])
+def test_week_buckets_start_on_monday(stored, week):
+    [[start]] = sqlite3.connect(":memory:").execute(f"SELECT {bucket_start('sqlite', 'week', '?')}", [stored])
+    assert start == f"{week} 00:00:00.000000"